@@ -3,34 +3,98 @@ import discord
 import asyncio
 import datetime
 import json
+import hashlib
+import heapq
+import re
+import sqlite3
 import pytz
 import time
-import requests
+import aiohttp
+import random
+import contextlib
+import cProfile
+import io
+import pstats
+import tracemalloc
+from collections import OrderedDict, deque
+from dataclasses import dataclass
 from datetime import timezone
 from discord import app_commands
-from discord.ext import commands, tasks
+from aiohttp import web
+from discord.ext import commands
 from dotenv import load_dotenv
 
 load_dotenv()
 token = os.getenv("token")
 DATA_FILE = "star_caller_data.json"
+DATABASE_FILE = "star_caller_data.db"
+storage = os.getenv("storage", "json")
 api = os.getenv("api")
 
 AUTHORIZED_SERVER_IDS = [
     1274620800896339968,  #development
     282907227017183232,   #star-find
 ]
-
-class StarCaller(commands.Bot):
+HOST_SERVER_ID = int(os.getenv("host", AUTHORIZED_SERVER_IDS[-1]))
+
+metrics_port = os.getenv("metrics_port")
+shards = os.getenv("shards")
+shard_ids = os.getenv("shard_ids")
+SHARDED = shards is not None
+IS_PUBLISHER = os.getenv("publisher", "true").lower() in ("1", "true", "yes")
+
+if SHARDED and storage != "sqlite":
+    raise RuntimeError("Sharded mode needs the shared sqlite backend, set storage = \"sqlite\".")
+if shard_ids and not (shards or "").isdigit():
+    raise RuntimeError("shard_ids needs a numeric shards count.")
+
+def shard_options():
+    if not SHARDED:
+        return {}
+    options = {}
+    if shards.isdigit():
+        options["shard_count"] = int(shards)
+    if shard_ids:
+        options["shard_ids"] = [int(shard_id) for shard_id in shard_ids.split(",")]
+    return options
+
+class StarCaller(commands.AutoShardedBot if SHARDED else commands.Bot):
     def __init__(self):
         super().__init__(
             command_prefix="", 
             intents=discord.Intents.all(),
+            http_trace=edit_scheduler.trace_config(),
+            **shard_options(),
         )
 
     async def setup_hook(self):
-        self.auto_clear_restricted.start()
-        await self.tree.sync()
+        self.message_queue = MessageQueue(publishing=IS_PUBLISHER)
+        self.message_queue.start()
+        self.expiry_schedulers = [
+            ExpiryScheduler(state.store, lambda state=state: self.run_maintenance_sweep(state))
+            for state in guild_tables
+        ] if IS_PUBLISHER else []
+        self.expiry_task = asyncio.create_task(self.run_expiry_scheduler())
+        if SHARDED:
+            self.replicator = TableReplicator(guild_tables)
+            self.replicator.add_listener(self.publish_replicated)
+            self.replicator_task = asyncio.create_task(self.replicator.run())
+        if api:
+            star_reporter.start()
+        if metrics_port:
+            self.metrics_runner = await metrics.serve(int(metrics_port))
+        if IS_PUBLISHER:
+            await self.tree.sync()
+
+    def publish_replicated(self, state, chunk_indices):
+        if not IS_PUBLISHER or not chunk_indices or not state.chunk_message_ids:
+            return
+        channel = self.get_channel(state.channel_id)
+        if not channel:
+            return
+        for chunk_index in chunk_indices:
+            if chunk_index < len(state.chunk_message_ids):
+                self.message_queue.put(state, chunk_index, state.chunk_message(channel, chunk_index))
 
     async def on_ready(self):
         await self.change_presence(
@@ -38,105 +102,1353 @@ class StarCaller(commands.Bot):
         )
 
     async def close(self):
+        if hasattr(self, 'replicator_task'):
+            self.replicator_task.cancel()
         if hasattr(self, 'message_queue'):
             await self.message_queue.stop()
+        await star_reporter.close()
+        for state in guild_tables:
+            await state.writer.close()
+        if hasattr(self, 'metrics_runner'):
+            await self.metrics_runner.cleanup()
         await super().close()
 
     def cog_unload(self):
-        self.auto_clear_restricted.cancel()
+        self.expiry_task.cancel()
+
+    async def run_expiry_scheduler(self):
+        await self.wait_until_ready()
+        await asyncio.gather(*(scheduler.run() for scheduler in self.expiry_schedulers))
 
-    @tasks.loop(minutes=15)
-    async def auto_clear_restricted(self):
+    async def run_maintenance_sweep(self, state):
         try:
-            class DummyResponse:
-                async def send_message(self, content, ephemeral=False):
-                    return None
-                
-                async def defer(self):
-                    pass
+            if not state.chunk_message_ids or state.is_locked:
+                return
 
-            class DummyFollowup:
-                async def send(self, content):
-                    class DummyMessage:
-                        async def edit(self, content):
-                            pass
-                    return DummyMessage()
-
-            class DummyInteraction:
-                def __init__(self, client):
-                    self.client = client
-                    self.response = DummyResponse()
-                    self.followup = DummyFollowup()
-
-            dummy_interaction = DummyInteraction(self)
-
-            command = self.tree.get_command("clear-restricted")
-            if command:
-                await command.callback(dummy_interaction)
-                #print(f"[{datetime.datetime.now(pytz.UTC)}] Invoked clear-restricted.")
-            else:
-                print("Clear-restricted command not found")
+            channel = self.get_channel(state.channel_id)
+            if not channel:
+                print(f"Maintenance sweep could not find the table channel for guild {state.guild_id}")
+                return
+
+            started = time.perf_counter()
+            async with state.hold_table():
+                cleared = state.maintenance.clear_restricted()
+                chunks = state.stale_chunks()
+            metrics.sweep_duration.observe(time.perf_counter() - started)
+            if not cleared:
+                return
+
+            for chunk_index in chunks:
+                self.message_queue.put(state, chunk_index, state.chunk_message(channel, chunk_index))
 
         except Exception as e:
-            print(f"Error in auto_clear_restricted: {str(e)}")
+            print(f"Error in maintenance sweep: {str(e)}")
             import traceback
             traceback.print_exc()
 
-    @auto_clear_restricted.before_loop
-    async def before_auto_clear(self):
-        await self.wait_until_ready()
+class TokenBucket:
+    def __init__(self, capacity=5, period=5.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    def delay(self):
+        now = self.refill()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.refill()
+        self.tokens -= 1
+
+    def observe(self, limit, remaining, reset_after):
+        now = self.refill()
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+            if remaining < 1 and reset_after:
+                self.blocked_until = max(self.blocked_until, now + reset_after)
+
+    def penalize(self, retry_after):
+        now = self.refill()
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + retry_after)
+
+class EditScheduler:
+    message_route = re.compile(r"/channels/(\d+)/messages")
+
+    def __init__(self, capacity=5, period=5.0, max_retries=3, retry_delay=2.0):
+        self.capacity = capacity
+        self.period = period
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.buckets = {}
+        self.locks = {}
+        self.rate_limited = {}
+
+    def bucket(self, method, channel_id):
+        key = (method, channel_id)
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(self.capacity, self.period)
+            self.locks[key] = asyncio.Lock()
+        return self.buckets[key]
+
+    async def acquire(self, channel_id, method="PATCH"):
+        bucket = self.bucket(method, channel_id)
+        async with self.locks[(method, channel_id)]:
+            while (delay := bucket.delay()) > 0:
+                await asyncio.sleep(delay)
+            bucket.take()
+
+    def trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_end.append(self.on_request_end)
+        return trace_config
+
+    async def on_request_end(self, session, context, params):
+        match = self.message_route.search(params.url.path)
+        if not match:
+            return
+        headers = params.response.headers
+        bucket = self.bucket(params.method, int(match.group(1)))
+
+        def header(name):
+            value = headers.get(name)
+            return float(value) if value is not None else None
+
+        limit = header("X-RateLimit-Limit")
+        bucket.observe(
+            int(limit) if limit is not None else None,
+            header("X-RateLimit-Remaining"),
+            header("X-RateLimit-Reset-After"),
+        )
+        if params.response.status == 429:
+            route = f"{params.method} /channels/{match.group(1)}/messages"
+            self.rate_limited[route] = self.rate_limited.get(route, 0) + 1
+            bucket.penalize(header("Retry-After") or header("X-RateLimit-Reset-After") or self.period)
+
+    async def edit(self, state, chunk_index, message, content):
+        for attempt in range(self.max_retries):
+            await self.acquire(message.channel.id)
+            try:
+                await state.edit_chunk(chunk_index, message, content)
+                return True
+
+            except discord.NotFound:
+                print(f"Chunk {chunk_index} message not found, skipping.")
+                return False
+
+            except discord.RateLimited as e:
+                print(f"Rate limited on chunk {chunk_index}, waiting {e.retry_after} seconds.")
+                self.bucket("PATCH", message.channel.id).penalize(e.retry_after)
+
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    retry_after = float(e.response.headers.get('Retry-After', self.period))
+                    print(f"Rate limited (HTTP 429) on chunk {chunk_index}, waiting {retry_after} seconds.")
+                    self.bucket("PATCH", message.channel.id).penalize(retry_after)
+                else:
+                    print(f"Error editing chunk {chunk_index} (attempt {attempt + 1}): {e}")
+                    await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+            except Exception as e:
+                print(f"Unexpected error on chunk {chunk_index} (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+        print(f"Failed to process chunk {chunk_index} after {self.max_retries} attempts")
+        return False
+
+    async def send(self, channel, content):
+        for attempt in range(self.max_retries):
+            await self.acquire(channel.id, "POST")
+            try:
+                return await channel.send(content=content)
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    retry_after = float(e.response.headers.get('Retry-After', self.period))
+                    print(f"Rate limited (HTTP 429) sending table chunk, waiting {retry_after} seconds.")
+                    self.bucket("POST", channel.id).penalize(retry_after)
+                elif e.status < 500 or attempt == self.max_retries - 1:
+                    raise
+                else:
+                    print(f"Error sending table chunk (attempt {attempt + 1}): {e}")
+                    await asyncio.sleep(self.retry_delay * 2 ** attempt)
+        raise RuntimeError(f"Failed to send table chunk after {self.max_retries} attempts")
+
+edit_scheduler = EditScheduler()
+
+class Histogram:
+    def __init__(self, buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self, name, description):
+        lines = [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+        for key, (counts, total, count) in self.series.items():
+            labels = ",".join(f'{label}="{value}"' for label, value in key)
+            prefix = f"{labels}," if labels else ""
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {bucket_count}')
+            lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {total}")
+            lines.append(f"{name}_count{suffix} {count}")
+        return lines
+
+def metric_lines(name, kind, description, samples):
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label_text = ",".join(f'{label}="{label_value}"' for label, label_value in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return lines
+
+class Metrics:
+    def __init__(self):
+        self.command_latency = Histogram()
+        self.call_to_edit = Histogram()
+        self.sweep_duration = Histogram()
+        self.write_latency = Histogram((0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+    def render(self):
+        lines = []
+        lines += self.command_latency.render("star_caller_command_latency_seconds", "Time from interaction creation to command completion.")
+        lines += self.call_to_edit.render("star_caller_call_to_edit_seconds", "Time from a /call interaction to its chunk edit landing.")
+        lines += self.sweep_duration.render("star_caller_sweep_duration_seconds", "Time spent committing a background expiry sweep.")
+        lines += self.write_latency.render("star_caller_write_latency_seconds", "Time spent persisting the table to storage.")
+
+        queue = getattr(client, "message_queue", None)
+        if queue is not None:
+            lines += metric_lines("star_caller_message_queue_depth", "gauge", "Chunk edits waiting to be sent.", [({}, queue.depth)])
+            lines += metric_lines("star_caller_message_queue_edits_total", "counter", "Chunk edits sent.", [({}, queue.edits)])
+            lines += metric_lines("star_caller_message_queue_coalesced_total", "counter", "Chunk edits merged into a pending edit.", [({}, queue.coalesced)])
+            lines += metric_lines("star_caller_message_queue_skipped_total", "counter", "Chunk edits skipped because the chunk was already current.", [({}, queue.skipped)])
+
+        lines += metric_lines(
+            "star_caller_rate_limited_total", "counter", "HTTP 429 responses per route.",
+            [({"route": route}, count) for route, count in edit_scheduler.rate_limited.items()],
+        )
+        lines += metric_lines(
+            "star_caller_lock_wait_seconds_total", "counter", "Time spent waiting for table chunk locks.",
+            [({"guild": state.guild_id}, state.chunk_locks.wait_time) for state in guild_tables],
+        )
+        lines += metric_lines(
+            "star_caller_lock_acquisitions_total", "counter", "Table chunk lock acquisitions.",
+            [({"guild": state.guild_id}, state.chunk_locks.acquisitions) for state in guild_tables],
+        )
+        lines += metric_lines(
+            "star_caller_lock_wait_max_seconds", "gauge", "Longest wait for table chunk locks.",
+            [({"guild": state.guild_id}, state.chunk_locks.max_wait) for state in guild_tables],
+        )
+        lines += metric_lines(
+            "star_caller_query_cache_total", "counter", "Find command cache lookups.",
+            [({"result": "hit"}, query_cache.hits), ({"result": "miss"}, query_cache.misses)],
+        )
+        return "\n".join(lines) + "\n"
+
+    async def handle(self, request):
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def serve(self, port, host="127.0.0.1"):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        print(f"Metrics available at http://{host}:{port}/metrics")
+        return runner
+
+metrics = Metrics()
+
+class Span:
+    __slots__ = ("samples", "started")
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.samples.append(time.perf_counter() - self.started)
+        return False
+
+class SpanRecorder:
+    def __init__(self, size=1024):
+        self.size = size
+        self.stages = {}
+        self.capturing = False
+
+    def span(self, stage):
+        samples = self.stages.get(stage)
+        if samples is None:
+            samples = self.stages[stage] = deque(maxlen=self.size)
+        return Span(samples)
+
+    def percentiles(self, stage, quantiles=(0.5, 0.95, 0.99)):
+        samples = sorted(self.stages[stage])
+        return [samples[int(q * (len(samples) - 1))] for q in quantiles]
+
+    def report(self):
+        lines = [f"{'stage':<24} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        for stage in sorted(self.stages):
+            if not self.stages[stage]:
+                continue
+            p50, p95, p99 = self.percentiles(stage)
+            lines.append(f"{stage:<24} {len(self.stages[stage]):>6} {p50 * 1000:>9.2f} {p95 * 1000:>9.2f} {p99 * 1000:>9.2f}")
+        return "\n".join(lines)
+
+    async def profile(self, seconds, limit=40):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+    async def trace_allocations(self, seconds, limit=40):
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            await asyncio.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+        finally:
+            if not already_tracing:
+                tracemalloc.stop()
+        return "\n".join(str(stat) for stat in after.compare_to(before, "lineno")[:limit])
+
+perf = SpanRecorder()
+
+def progress_updater(progress_message, label, interval=5):
+    last_progress_update = time.time()
+
+    async def update(done, total):
+        nonlocal last_progress_update
+        current_time = time.time()
+        if current_time - last_progress_update >= interval:
+            try:
+                await progress_message.edit(content=f"{label} ({done}/{total} chunks)")
+                last_progress_update = current_time
+            except discord.HTTPException as e:
+                print(f"Failed to update progress message: {e}")
+
+    return update
+
+def completion_message(message, failed):
+    if not failed:
+        return message
+    return f"{message}\n`{len(failed)}` table chunk(s) could not be updated and will be retried on the next clear."
 
 client = StarCaller()
-client.clear_lock = asyncio.Lock()
 
 class MessageQueue:
-    def __init__(self):
-        self.queue = asyncio.Queue()
-        self.task = None
+    def __init__(self, concurrency=3, publishing=True):
+        self.concurrency = concurrency
+        self.publishing = publishing
+        self.pending = {}
+        self.in_flight = set()
+        self.ready = asyncio.Event()
+        self.drained = asyncio.Event()
+        self.drained.set()
+        self.tasks = []
         self.running = True
+        self.edits = 0
+        self.coalesced = 0
+        self.skipped = 0
+
+    @property
+    def depth(self):
+        return len(self.pending)
+
+    def put(self, state, chunk_index, message, called_at=None):
+        waiter = asyncio.get_running_loop().create_future()
+        if not self.publishing:
+            waiter.set_result(True)
+            return waiter
+        pending = self.pending.get(message.id)
+        if pending is not None:
+            self.coalesced += 1
+            pending[3].append(waiter)
+            if called_at is not None:
+                pending[4].append(called_at)
+        else:
+            self.pending[message.id] = (state, chunk_index, message, [waiter], [] if called_at is None else [called_at])
+        self.drained.clear()
+        self.ready.set()
+        return waiter
+
+    async def publish(self, state, channel, chunk_indices, on_progress=None):
+        results = {}
+
+        async def wait(chunk_index, waiter):
+            results[chunk_index] = await waiter
+            if on_progress:
+                await on_progress(len(results), len(chunk_indices))
+
+        await asyncio.gather(*(
+            wait(chunk_index, self.put(state, chunk_index, state.chunk_message(channel, chunk_index)))
+            for chunk_index in chunk_indices
+        ))
+
+        for chunk_index in chunk_indices:
+            if not results[chunk_index] and state.chunk_message_ids[chunk_index] not in state.missing_message_ids:
+                print(f"Retrying chunk {chunk_index}")
+                results[chunk_index] = await self.put(state, chunk_index, state.chunk_message(channel, chunk_index))
+
+        return [chunk_index for chunk_index in chunk_indices if not results[chunk_index]]
+
+    def next_message_id(self):
+        return next((message_id for message_id in self.pending if message_id not in self.in_flight), None)
 
     async def process_queue(self):
-        while self.running:
+        while self.running or self.pending:
             try:
-                message, content = await self.queue.get()
-                await message.edit(content=content)
-                self.queue.task_done()
-                await asyncio.sleep(6)
+                message_id = self.next_message_id()
+                if message_id is None:
+                    self.ready.clear()
+                    await self.ready.wait()
+                    continue
+
+                state, chunk_index, message, waiters, calls = self.pending.pop(message_id)
+                self.in_flight.add(message_id)
+                delivered = False
+                try:
+                    if state.is_published(chunk_index):
+                        self.skipped += 1
+                        delivered = True
+                    else:
+                        delivered = await edit_scheduler.edit(state, chunk_index, message, state.renderer.chunk(chunk_index))
+                        if delivered:
+                            self.edits += 1
+                            landed = time.time()
+                            for called_at in calls:
+                                metrics.call_to_edit.observe(landed - called_at)
+                except Exception as e:
+                    print(f"Failed to publish table chunk {chunk_index}: {e}")
+                finally:
+                    self.in_flight.discard(message_id)
+                    self.ready.set()
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(delivered)
+                    if not self.pending and not self.in_flight:
+                        self.drained.set()
             except asyncio.CancelledError:
                 break
-            except Exception as e:
-                print(f"Error processing message edit: {e}")
 
     def start(self):
-        self.task = asyncio.create_task(self.process_queue())
+        self.tasks = [asyncio.create_task(self.process_queue()) for _ in range(self.concurrency)]
 
     async def stop(self):
         self.running = False
-        if self.task:
-            await self.queue.join()
-            self.task.cancel()
+        if self.tasks:
+            await self.drained.wait()
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        print(f"Message queue stopped: {self.edits} edits sent, {self.coalesced} coalesced, {self.skipped} already current.")
+
+def default_table_data():
+    return {
+        "is_locked": False, 
+        "entries": [],      
+        "message_id": None, 
+        "channel_id": None,  
+        "chunk_message_ids": []  
+    }
+
+def write_table_data(data, path=DATA_FILE):
+    payload = json.dumps({**data, "entries": [entry.to_dict() for entry in data["entries"]]})
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+class JsonBackend:
+    def __init__(self, path=DATA_FILE):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                loaded_data = json.load(f)
+            loaded_data["entries"] = [StarEntry.parse(entry) for entry in loaded_data["entries"]]
+            return loaded_data
+        except FileNotFoundError:
+            return default_table_data()
+
+    def save(self, data, changed_rows=None, changed_keys=None):
+        write_table_data(data, self.path)
+
+class SQLiteBackend:
+    def __init__(self, path=DATABASE_FILE, json_path=DATA_FILE):
+        self.path = path
+        self.json_path = json_path
+        self.needs_full_write = False
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                world INTEGER PRIMARY KEY,
+                position INTEGER NOT NULL,
+                region TEXT NOT NULL DEFAULT '',
+                size TEXT NOT NULL DEFAULT '',
+                game_time TEXT NOT NULL DEFAULT '',
+                game_time_full TEXT NOT NULL DEFAULT '',
+                size_number INTEGER,
+                expires_at INTEGER,
+                called INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS entries_position ON entries (position);
+        """)
+        self.connection.commit()
+
+    def load(self):
+        rows = self.connection.execute("SELECT key, value FROM meta").fetchall()
+        self.needs_full_write = not rows
+        if not rows:
+            return JsonBackend(self.json_path).load()
+
+        data = default_table_data()
+        data.update({key: json.loads(value) for key, value in rows})
+        data["entries"] = [
+            StarEntry.parse({"world": world, "region": region, "size": size, "game_time": game_time, "game_time_full": game_time_full})
+            for world, region, size, game_time, game_time_full in self.connection.execute(
+                "SELECT world, region, size, game_time, game_time_full FROM entries ORDER BY position"
+            )
+        ]
+        return data
+
+    def _entry_row(self, position, entry):
+        return (
+            entry.world, position, entry.region, entry.size, entry.game_time, entry.game_time_full,
+            entry.size_number, entry.expires_at, int(entry.called),
+        )
+
+    def save(self, data, changed_rows=None, changed_keys=None):
+        entries = data["entries"]
+        if changed_keys is None or self.needs_full_write:
+            changed_keys = [key for key in data if key != "entries"]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(key, json.dumps(data[key])) for key in changed_keys],
+            )
+            if changed_rows is None or self.needs_full_write:
+                self.connection.execute("DELETE FROM entries")
+                changed_rows = range(len(entries))
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._entry_row(position, entries[position]) for position in changed_rows if position < len(entries)],
+            )
+        self.needs_full_write = False
+
+    def data_version(self):
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+class TableWriter:
+    def __init__(self, backend, delay=0.25 if SHARDED else 2.0, max_backoff=60.0):
+        self.backend = backend
+        self.delay = delay
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.sleeping = False
+        self.closing = False
+        self.data = None
+        self.dirty = False
+        self.changed_rows = set()
+        self.changed_keys = set()
+        self.full_write = False
+        self.replicating = False
+        self.task = None
+        self.lock = asyncio.Lock()
+        self.requests = 0
+        self.writes = 0
+
+    def entry_changed(self, index):
+        if self.replicating:
+            return
+        if index is None:
+            self.full_write = True
+        else:
+            self.changed_rows.add(index)
+
+    def data_changed(self, *keys):
+        if not self.replicating:
+            self.changed_keys.update(keys)
+
+    def schedule(self, data):
+        self.data = data
+        self.dirty = True
+        self.requests += 1
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.flush_later())
+
+    async def flush_later(self):
+        while self.dirty and not self.closing:
+            self.sleeping = True
+            try:
+                await asyncio.sleep(min(self.delay * 2 ** self.failures, self.max_backoff))
+            finally:
+                self.sleeping = False
+            await self.flush()
+
+    async def flush(self):
+        async with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            snapshot = {
+                **self.data,
+                "entries": list(self.data["entries"]),
+                "chunk_message_ids": list(self.data.get("chunk_message_ids", [])),
+                "chunk_hashes": list(self.data.get("chunk_hashes", [])),
+            }
+            changed_rows = None if self.full_write else self.changed_rows
+            changed_keys = self.changed_keys
+            self.changed_rows = set()
+            self.changed_keys = set()
+            self.full_write = False
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.backend.save, snapshot, changed_rows, changed_keys)
+                self.writes += 1
+                self.failures = 0
+                metrics.write_latency.observe(time.perf_counter() - started)
+            except Exception as e:
+                self.dirty = True
+                self.failures += 1
+                if changed_rows is None:
+                    self.full_write = True
+                else:
+                    self.changed_rows |= changed_rows
+                self.changed_keys |= changed_keys
+                print(f"Error saving table data (attempt {self.failures}): {e}")
+
+    async def close(self):
+        self.closing = True
+        if self.task and not self.task.done():
+            if self.sleeping:
+                self.task.cancel()
             try:
                 await self.task
             except asyncio.CancelledError:
                 pass
+        await self.flush()
+
+def table_paths(guild_id):
+    if guild_id == HOST_SERVER_ID:
+        return DATA_FILE, DATABASE_FILE
+    return f"star_caller_data_{guild_id}.json", f"star_caller_data_{guild_id}.db"
+
+def storage_backend(guild_id):
+    json_path, database_path = table_paths(guild_id)
+    return SQLiteBackend(database_path, json_path) if storage == "sqlite" else JsonBackend(json_path)
+
+def size_class(size_number):
+    if size_number <= 3:
+        return "sm"
+    if size_number <= 6:
+        return "avg"
+    return "big"
+
+@dataclass(frozen=True, slots=True)
+class StarEntry:
+    world: int
+    region: str = ""
+    size: str = ""
+    game_time: str = ""
+    game_time_full: str = ""
+    size_number: int | None = None
+    size_class: str = ""
+    expires_at: int | None = None
+    called: bool = False
+
+    @classmethod
+    def parse(cls, data):
+        size = data.get("size", "")
+        game_time = data.get("game_time", "")
+        game_time_full = data.get("game_time_full", "")
+        size_number = int(size[1:]) if is_valid_size(size) else None
+
+        expires_at = None
+        if game_time_full:
+            try:
+                expires_at = int(datetime.datetime.fromisoformat(game_time_full).timestamp())
+            except (ValueError, TypeError):
+                pass
 
-def load_table_data():
-    try:
-        with open(DATA_FILE, 'r') as f:
-            loaded_data = json.load(f)
-        return loaded_data
-    except FileNotFoundError:
+        return cls(
+            world=data["world"],
+            region=data.get("region", ""),
+            size=size,
+            game_time=game_time,
+            game_time_full=game_time_full,
+            size_number=size_number,
+            size_class=size_class(size_number) if size_number is not None else size,
+            expires_at=expires_at,
+            called=(
+                size_number is not None and
+                data.get("region", "") != "" and
+                expires_at is not None and
+                is_valid_game_time(game_time)
+            ),
+        )
+
+    @property
+    def is_blank(self):
+        return not (self.region or self.size or self.game_time or self.game_time_full)
+
+    def to_dict(self):
         return {
-            "is_locked": False, 
-            "entries": [],      
-            "message_id": None, 
-            "channel_id": None,  
-            "chunk_message_ids": []  
+            "world": self.world,
+            "region": self.region,
+            "size": self.size,
+            "game_time": self.game_time,
+            "game_time_full": self.game_time_full,
         }
 
-def save_table_data(data):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f)
+def blank_entry(world):
+    return StarEntry(world)
+
+class SizeLeaderboard:
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, size_number):
+        self.counts[size_number] = self.counts.get(size_number, 0) + 1
+
+    def remove(self, size_number):
+        count = self.counts.get(size_number, 0) - 1
+        if count > 0:
+            self.counts[size_number] = count
+        else:
+            self.counts.pop(size_number, None)
+
+    def top(self, n=1):
+        return sorted(self.counts, reverse=True)[:n]
+
+@dataclass(frozen=True, slots=True)
+class TableSnapshot:
+    version: int
+    entries: tuple
+    world_index: dict
+    called_entries: tuple
+    free_to_play_entries: tuple
+    by_size: dict
+    by_region: dict
+    free_to_play_by_size: dict
+    sizes: tuple
+    free_to_play_sizes: tuple
+
+    def __contains__(self, world):
+        return world in self.world_index
+
+    def get(self, world):
+        index = self.world_index.get(world)
+        return None if index is None else self.entries[index]
+
+    def called(self):
+        return self.called_entries
+
+    def with_size(self, size_number):
+        return self.by_size.get(size_number, ())
+
+    def in_region(self, region):
+        return self.by_region.get(region, ())
+
+    def free_to_play_called(self):
+        return self.free_to_play_entries
+
+    def free_to_play_with_size(self, size_number):
+        return self.free_to_play_by_size.get(size_number, ())
+
+class StarStore:
+    def __init__(self, entries):
+        self.entries = entries
+        self.listeners = []
+        self.version = 0
+        self.current_snapshot = None
+        self.rebuild()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def _notify(self, index):
+        self.version += 1
+        for listener in self.listeners:
+            listener(index)
+
+    def rebuild(self):
+        self.dirty_sizes = None
+        self.dirty_regions = None
+        self.world_index = {}
+        self.by_size = {}
+        self.by_region = {}
+        self.free_to_play = set()
+        self.called_worlds = set()
+        self.sizes = SizeLeaderboard()
+        self.free_to_play_sizes = SizeLeaderboard()
+        for i, entry in enumerate(self.entries):
+            self.world_index[entry.world] = i
+            self._index(entry)
+
+    def _index(self, entry):
+        if not entry.called:
+            return
+        world = entry.world
+        self.called_worlds.add(world)
+        self.by_size.setdefault(entry.size_number, set()).add(world)
+        self.by_region.setdefault(entry.region, set()).add(world)
+        self.sizes.add(entry.size_number)
+        self._mark_dirty(entry)
+        if world in free_to_play_world_set:
+            self.free_to_play.add(world)
+            self.free_to_play_sizes.add(entry.size_number)
+
+    def _unindex(self, entry):
+        world = entry.world
+        if world not in self.called_worlds:
+            return
+        self.called_worlds.discard(world)
+        self.sizes.remove(entry.size_number)
+        self._mark_dirty(entry)
+        if world in self.free_to_play:
+            self.free_to_play_sizes.remove(entry.size_number)
+        for index, key in ((self.by_size, entry.size_number), (self.by_region, entry.region)):
+            worlds = index.get(key)
+            if worlds is not None:
+                worlds.discard(world)
+                if not worlds:
+                    del index[key]
+        self.free_to_play.discard(world)
+
+    def _mark_dirty(self, entry):
+        if self.dirty_sizes is not None:
+            self.dirty_sizes.add(entry.size_number)
+            self.dirty_regions.add(entry.region)
+
+    def _refreshed(self, previous, keys, worlds_for):
+        result = dict(previous)
+        for key in keys:
+            worlds = worlds_for(key)
+            if worlds:
+                result[key] = tuple(self._in_table_order(worlds))
+            else:
+                result.pop(key, None)
+        return result
+
+    def snapshot(self):
+        previous = self.current_snapshot
+        if previous is not None and previous.version == self.version:
+            return previous
+        if previous is None or self.dirty_sizes is None:
+            previous_sizes, previous_regions, previous_free_to_play = {}, {}, {}
+            dirty_sizes, dirty_regions = set(self.by_size), set(self.by_region)
+        else:
+            previous_sizes, previous_regions, previous_free_to_play = previous.by_size, previous.by_region, previous.free_to_play_by_size
+            dirty_sizes, dirty_regions = self.dirty_sizes, self.dirty_regions
+        self.current_snapshot = TableSnapshot(
+            version=self.version,
+            entries=tuple(self.entries),
+            world_index=self.world_index,
+            called_entries=tuple(self.called()),
+            free_to_play_entries=tuple(self.free_to_play_called()),
+            by_size=self._refreshed(previous_sizes, dirty_sizes, lambda key: self.by_size.get(key)),
+            by_region=self._refreshed(previous_regions, dirty_regions, lambda key: self.by_region.get(key)),
+            free_to_play_by_size=self._refreshed(
+                previous_free_to_play, dirty_sizes, lambda key: self.by_size.get(key, set()) & self.free_to_play
+            ),
+            sizes=tuple(self.sizes.top(len(self.sizes.counts))),
+            free_to_play_sizes=tuple(self.free_to_play_sizes.top(len(self.free_to_play_sizes.counts))),
+        )
+        self.dirty_sizes = set()
+        self.dirty_regions = set()
+        return self.current_snapshot
+
+    def __contains__(self, world):
+        return world in self.world_index
+
+    def __len__(self):
+        return len(self.entries)
+
+    def index_of(self, world):
+        return self.world_index.get(world)
+
+    def get(self, world):
+        index = self.world_index.get(world)
+        return None if index is None else self.entries[index]
+
+    def update(self, world, **fields):
+        index = self.world_index[world]
+        entry = self.entries[index]
+        self._unindex(entry)
+        entry = self.entries[index] = StarEntry.parse({**entry.to_dict(), **fields})
+        self._index(entry)
+        self._notify(index)
+        return index
+
+    def put(self, entry):
+        index = self.world_index[entry.world]
+        self._unindex(self.entries[index])
+        self.entries[index] = entry
+        self._index(entry)
+        self._notify(index)
+        return index
+
+    def reset(self, world):
+        index = self.world_index[world]
+        self._unindex(self.entries[index])
+        self.entries[index] = blank_entry(world)
+        self._notify(index)
+        return index
+
+    def replace(self, entries):
+        self.entries[:] = entries
+        self.rebuild()
+        self._notify(None)
+
+    def _in_table_order(self, worlds):
+        return [self.entries[i] for i in sorted(self.world_index[world] for world in worlds)]
+
+    def called(self):
+        return self._in_table_order(self.called_worlds)
+
+    def with_size(self, size_number):
+        return self._in_table_order(self.by_size.get(size_number, ()))
+
+    def in_region(self, region):
+        return self._in_table_order(self.by_region.get(region, ()))
+
+    def free_to_play_called(self):
+        return self._in_table_order(self.free_to_play)
+
+    def free_to_play_with_size(self, size_number):
+        return self._in_table_order(self.by_size.get(size_number, set()) & self.free_to_play)
+
+CHUNK_SIZE = 32
+
+def chunk_hash(content):
+    return hashlib.sha1(content.encode()).hexdigest()
+
+class TableRenderer:
+    def __init__(self, store):
+        self.store = store
+        self.rows = []
+        self.chunk_cache = []
+        self.chunk_hashes = []
+        self.dirty = set()
+        self.rebuild()
+        store.add_listener(self.entry_changed)
+
+    def render_row(self, entry):
+        return f"{coloured_world_names.get(entry.world, entry.world)} {entry.region:<17} {entry.size:<4} {entry.game_time:<4}"
+
+    def rebuild(self):
+        self.rows = [self.render_row(entry) for entry in self.store.entries]
+        self.chunk_cache = [None] * self.chunk_count()
+        self.chunk_hashes = [None] * self.chunk_count()
+        self.dirty = set(range(self.chunk_count()))
+
+    def entry_changed(self, index):
+        if index is None or len(self.rows) != len(self.store.entries):
+            self.rebuild()
+            return
+        row = self.render_row(self.store.entries[index])
+        if row != self.rows[index]:
+            self.rows[index] = row
+            self.dirty.add(index // CHUNK_SIZE)
+
+    def chunk_count(self):
+        return (len(self.rows) + CHUNK_SIZE - 1) // CHUNK_SIZE
+
+    def chunk(self, chunk_index):
+        if chunk_index in self.dirty:
+            start = chunk_index * CHUNK_SIZE
+            content = "```ansi\n" + "\n".join(self.rows[start:start + CHUNK_SIZE]) + "```"
+            self.chunk_cache[chunk_index] = content
+            self.chunk_hashes[chunk_index] = chunk_hash(content)
+            self.dirty.discard(chunk_index)
+        return self.chunk_cache[chunk_index]
+
+    def chunk_hash(self, chunk_index):
+        self.chunk(chunk_index)
+        return self.chunk_hashes[chunk_index]
+
+    def chunks(self):
+        return [self.chunk(i) for i in range(self.chunk_count())]
+
+RESTRICTED_GRACE = 30 * 60
+
+class ExpiryScheduler:
+    def __init__(self, store, callback, grace=RESTRICTED_GRACE, batch_window=10.0, retry_delay=60.0):
+        self.store = store
+        self.callback = callback
+        self.grace = grace
+        self.batch_window = batch_window
+        self.retry_delay = retry_delay
+        self.heap = []
+        self.wakeup = asyncio.Event()
+        self.passes = 0
+        self.rebuild()
+        store.add_listener(self.entry_changed)
+
+    def rebuild(self):
+        self.heap = [
+            (entry.expires_at + self.grace, entry.world, entry.expires_at)
+            for entry in self.store.entries
+            if entry.expires_at is not None
+        ]
+        heapq.heapify(self.heap)
+
+    def entry_changed(self, index):
+        if index is None:
+            self.rebuild()
+        else:
+            entry = self.store.entries[index]
+            if entry.expires_at is not None:
+                heapq.heappush(self.heap, (entry.expires_at + self.grace, entry.world, entry.expires_at))
+        self.wakeup.set()
+
+    def is_current(self, item):
+        entry = self.store.get(item[1])
+        return entry is not None and entry.expires_at == item[2]
+
+    def next_due(self):
+        while self.heap and not self.is_current(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def batch_deadline(self, due):
+        return max(item[0] for item in self.heap if item[0] <= due + self.batch_window and self.is_current(item))
+
+    async def run(self):
+        while True:
+            due = self.next_due()
+            self.wakeup.clear()
+            if due is None or due > time.time():
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), None if due is None else due - time.time())
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            deadline = self.batch_deadline(due)
+            if deadline > time.time():
+                await asyncio.sleep(deadline - time.time())
+
+            await self.callback()
+            self.passes += 1
+
+            now = time.time()
+            retry = []
+            while self.heap and self.heap[0][0] <= now:
+                item = heapq.heappop(self.heap)
+                if self.is_current(item):
+                    retry.append((now + self.retry_delay, item[1], item[2]))
+            for item in retry:
+                heapq.heappush(self.heap, item)
+
+class TableMaintenance:
+    def __init__(self, state):
+        self.state = state
+
+    def clear_all(self):
+        self.state.replace_entries([blank_entry(world) for world in all_worlds])
+        self.state.save()
+
+    def clear_expired(self, grace=0, now=None):
+        cutoff = (time.time() if now is None else now) - grace
+        expired = [
+            entry.world for entry in self.state.entries
+            if not entry.is_blank and (entry.expires_at is None or entry.expires_at <= cutoff)
+        ]
+        for world in expired:
+            self.state.reset_entry(world)
+        if expired:
+            self.state.save()
+        return len(expired)
+
+    def clear_restricted(self, now=None):
+        return self.clear_expired(RESTRICTED_GRACE, now)
+
+    def prune(self, world):
+        if world not in self.state.store:
+            return None
+        world_index = self.state.reset_entry(world)
+        self.state.save()
+        return world_index // CHUNK_SIZE
+
+class ChunkLocks:
+    def __init__(self):
+        self.locks = {}
+        self.acquisitions = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def lock(self, chunk_index):
+        lock = self.locks.get(chunk_index)
+        if lock is None:
+            lock = self.locks[chunk_index] = asyncio.Lock()
+        return lock
+
+    @contextlib.asynccontextmanager
+    async def hold(self, chunk_indices):
+        locks = [self.lock(i) for i in sorted(set(chunk_indices))]
+        acquired = []
+        started = time.perf_counter()
+        try:
+            for lock in locks:
+                await lock.acquire()
+                acquired.append(lock)
+            waited = time.perf_counter() - started
+            self.acquisitions += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+class TableState:
+    def __init__(self, backend, guild_id=None):
+        self.guild_id = guild_id
+        self.backend = backend
+        self.data = backend.load()
+        self.data.setdefault("chunk_hashes", [])
+        self.store = StarStore(self.data["entries"])
+        self.renderer = TableRenderer(self.store)
+        self.writer = TableWriter(backend)
+        self.store.add_listener(self.writer.entry_changed)
+        self.message_handles = {}
+        self.missing_message_ids = set()
+        self.chunk_locks = ChunkLocks()
+        self.maintenance = TableMaintenance(self)
+        self.restricted_cleared_at = None
+
+    @property
+    def entries(self):
+        return self.store.entries
+
+    @property
+    def version(self):
+        return self.store.version
+
+    def snapshot(self):
+        return self.store.snapshot()
+
+    @property
+    def is_locked(self):
+        return self.data["is_locked"]
+
+    @property
+    def message_id(self):
+        return self.data["message_id"]
+
+    @property
+    def channel_id(self):
+        return self.data["channel_id"]
+
+    @property
+    def chunk_message_ids(self):
+        return self.data["chunk_message_ids"]
+
+    def save(self):
+        self.writer.schedule(self.data)
+
+    def set_locked(self, locked):
+        self.data["is_locked"] = locked
+        self.writer.data_changed("is_locked")
+        self.save()
+
+    def update_entry(self, world, **fields):
+        return self.store.update(world, **fields)
+
+    def reset_entry(self, world):
+        return self.store.reset(world)
+
+    def replace_entries(self, entries):
+        self.store.replace(entries)
+
+    def apply_remote(self, data):
+        for key in ("is_locked", "message_id", "channel_id"):
+            self.data[key] = data[key]
+        if data["chunk_message_ids"] != self.data["chunk_message_ids"]:
+            self.data["chunk_message_ids"] = data["chunk_message_ids"]
+            self.data["chunk_hashes"] = data.get("chunk_hashes", [])
+            self.message_handles.clear()
+            self.missing_message_ids.clear()
+
+        self.writer.replicating = True
+        try:
+            entries = data["entries"]
+            if [entry.world for entry in entries] != [entry.world for entry in self.store.entries]:
+                self.store.replace(entries)
+                return list(range(self.renderer.chunk_count()))
+
+            changed = set()
+            for entry in entries:
+                if self.store.get(entry.world) != entry:
+                    changed.add(self.store.put(entry) // CHUNK_SIZE)
+            return sorted(changed)
+        finally:
+            self.writer.replicating = False
+
+    def begin_table(self, channel_id):
+        if not self.store.entries:
+            self.store.replace([blank_entry(world) for world in all_worlds])
+        self.data["channel_id"] = channel_id
+        self.data["message_id"] = None
+        self.data["chunk_message_ids"] = []
+        self.data["chunk_hashes"] = []
+        self.writer.data_changed("channel_id", "message_id", "chunk_message_ids", "chunk_hashes")
+        self.message_handles.clear()
+        self.missing_message_ids.clear()
+
+    def add_chunk_message(self, message_id, content):
+        if not self.data["chunk_message_ids"]:
+            self.data["message_id"] = message_id
+            self.writer.data_changed("message_id")
+        self.data["chunk_message_ids"].append(message_id)
+        self.writer.data_changed("chunk_message_ids")
+        self.mark_chunk_published(len(self.data["chunk_message_ids"]) - 1, content)
+
+    def mark_chunk_published(self, chunk_index, content):
+        hashes = self.data["chunk_hashes"]
+        if len(hashes) <= chunk_index:
+            hashes.extend([None] * (chunk_index + 1 - len(hashes)))
+        hashes[chunk_index] = chunk_hash(content)
+        self.writer.data_changed("chunk_hashes")
+
+    def chunk_of(self, world):
+        return self.store.index_of(world) // CHUNK_SIZE
+
+    def hold_chunks(self, chunk_indices):
+        return self.chunk_locks.hold(chunk_indices)
+
+    def hold_table(self):
+        return self.chunk_locks.hold(range(self.renderer.chunk_count()))
+
+    def is_published(self, chunk_index):
+        hashes = self.data["chunk_hashes"]
+        return chunk_index < len(hashes) and hashes[chunk_index] == self.renderer.chunk_hash(chunk_index)
+
+    def stale_chunks(self):
+        return [
+            i for i in range(min(self.renderer.chunk_count(), len(self.chunk_message_ids)))
+            if not self.is_published(i)
+        ]
+
+    def chunk_message(self, channel, chunk_index):
+        message_id = self.chunk_message_ids[chunk_index]
+        message = self.message_handles.get(message_id)
+        if message is None or message.channel.id != channel.id:
+            message = self.message_handles[message_id] = channel.get_partial_message(message_id)
+        return message
+
+    async def edit_chunk(self, chunk_index, message, content):
+        try:
+            await message.edit(content=content)
+        except discord.NotFound:
+            self.message_handles.pop(message.id, None)
+            self.missing_message_ids.add(message.id)
+            raise
+        self.mark_chunk_published(chunk_index, content)
+        self.save()
+
+class GuildTables:
+    def __init__(self, guild_ids, host_id):
+        self.host_id = host_id
+        self.tables = {}
+        for guild_id in [host_id, *guild_ids]:
+            if guild_id not in self.tables:
+                self.tables[guild_id] = TableState(storage_backend(guild_id), guild_id)
+
+    def __getitem__(self, guild_id):
+        return self.tables[guild_id]
+
+    def __iter__(self):
+        return iter(self.tables.values())
+
+    @property
+    def host(self):
+        return self.tables[self.host_id]
+
+    def for_reading(self, guild_id):
+        state = self.tables.get(guild_id)
+        if state is None or not state.chunk_message_ids:
+            return self.host
+        return state
+
+class TableReplicator:
+    def __init__(self, tables, interval=1.0):
+        self.tables = tables
+        self.interval = interval
+        self.versions = {}
+        self.listeners = []
+        self.syncs = 0
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    async def sync(self, state):
+        version = state.backend.data_version()
+        if version == self.versions.get(state.guild_id) or state.writer.dirty:
+            return
+        local_version = state.version
+        async with state.writer.lock:
+            data = await asyncio.to_thread(state.backend.load)
+        if state.version != local_version or state.writer.dirty:
+            return
+        self.versions[state.guild_id] = version
+        chunk_indices = state.apply_remote(data)
+        self.syncs += 1
+        for listener in self.listeners:
+            listener(state, chunk_indices)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for state in self.tables:
+                try:
+                    await self.sync(state)
+                except Exception as e:
+                    print(f"Error replicating table for guild {state.guild_id}: {e}")
 
 def check_authorized_server():
     async def predicate(interaction: discord.Interaction) -> bool:
@@ -161,36 +1473,43 @@ def is_valid_game_time(time_str: str) -> bool:
     except (ValueError, AttributeError):
         return False
 
-def is_valid_game_time_full(time_str: str) -> bool:
-    try:
-        datetime.datetime.fromisoformat(time_str)
-        return True
-    except (ValueError, TypeError):
-        return False
+REGION_URLS = {
+    "Anachronia": "https://runescape.wiki/w/Shooting_Star#Anachronia",
+    "Asgarnia": "https://runescape.wiki/w/Shooting_Star#Asgarnia",
+    "Ashdale": "https://runescape.wiki/w/Shooting_Star#Ashdale",
+    "Crandor/Karamja": "https://runescape.wiki/w/Shooting_Star#Crandor_or_Karamja",
+    "Daemonheim": "https://runescape.wiki/w/Shooting_Star#The_Daemonheim_peninsula",
+    "Feldip Hills": "https://runescape.wiki/w/Shooting_Star#The_Feldip_Hills",
+    "Frem/Lunar": "https://runescape.wiki/w/Shooting_Star#Fremennik_lands_or_Lunar_Isle",
+    "Kandarin": "https://runescape.wiki/w/Shooting_Star#Kandarin",
+    "Kharidian Desert": "https://runescape.wiki/w/Shooting_Star#The_Kharidian_Desert",
+    "Lost Grove": "https://runescape.wiki/w/Shooting_Star#The_Lost_Grove",
+    "Menaphos": "https://runescape.wiki/w/Shooting_Star#Menaphos",
+    "Misthalin": "https://runescape.wiki/w/Shooting_Star#Misthalin",
+    "Morytania/Mos": "https://runescape.wiki/w/Shooting_Star#Morytania_or_Mos_Le'Harmless",
+    "Pisc/Gnome/Tir": "https://runescape.wiki/w/Shooting_Star#Piscatoris,_the_Gnome_Stronghold_or_Tirannwn",
+    "Tuska": "https://runescape.wiki/w/Shooting_Star#Tuska",
+    "Wilderness": "https://runescape.wiki/w/Shooting_Star#The_Wilderness",
+}
+DEFAULT_REGION_URL = "https://runescape.wiki/w/Shooting_Star#Locations"
+region_links = {region: f"[{region}](<{url}>)" for region, url in REGION_URLS.items()}
 
 def get_region_url(region):
-    region_urls = {
-        "Anachronia": "https://runescape.wiki/w/Shooting_Star#Anachronia",
-        "Asgarnia": "https://runescape.wiki/w/Shooting_Star#Asgarnia",
-        "Ashdale": "https://runescape.wiki/w/Shooting_Star#Ashdale",
-        "Crandor/Karamja": "https://runescape.wiki/w/Shooting_Star#Crandor_or_Karamja",
-        "Daemonheim": "https://runescape.wiki/w/Shooting_Star#The_Daemonheim_peninsula",
-        "Feldip Hills": "https://runescape.wiki/w/Shooting_Star#The_Feldip_Hills",
-        "Frem/Lunar": "https://runescape.wiki/w/Shooting_Star#Fremennik_lands_or_Lunar_Isle",
-        "Kandarin": "https://runescape.wiki/w/Shooting_Star#Kandarin",
-        "Kharidian Desert": "https://runescape.wiki/w/Shooting_Star#The_Kharidian_Desert",
-        "Lost Grove": "https://runescape.wiki/w/Shooting_Star#The_Lost_Grove",
-        "Menaphos": "https://runescape.wiki/w/Shooting_Star#Menaphos",
-        "Misthalin": "https://runescape.wiki/w/Shooting_Star#Misthalin",
-        "Morytania/Mos": "https://runescape.wiki/w/Shooting_Star#Morytania_or_Mos_Le'Harmless",
-        "Pisc/Gnome/Tir": "https://runescape.wiki/w/Shooting_Star#Piscatoris,_the_Gnome_Stronghold_or_Tirannwn",
-        "Tuska": "https://runescape.wiki/w/Shooting_Star#Tuska",
-        "Wilderness": "https://runescape.wiki/w/Shooting_Star#The_Wilderness",
-    }
-    return region_urls.get(region, f"https://runescape.wiki/w/Shooting_Star#Locations")
+    return REGION_URLS.get(region, DEFAULT_REGION_URL)
+
+def observe_command(interaction, command, status):
+    if command is None:
+        return
+    elapsed = (datetime.datetime.now(datetime.timezone.utc) - interaction.created_at).total_seconds()
+    metrics.command_latency.observe(elapsed, command=command.name, status=status)
+
+@client.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    observe_command(interaction, command, "ok")
 
 @client.tree.error
 async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    observe_command(interaction, interaction.command, "error")
     if isinstance(error, app_commands.errors.CheckFailure):
         if not interaction.response.is_done():
             await interaction.response.send_message(
@@ -211,19 +1530,97 @@ async def on_command_error(ctx, error):
         return
     print(f"Message command error occurred: {str(error)}")
 
-def make_post_request(url, data):
-    try:
-        response = requests.post(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        #print(f"Error making POST request: {e}")
-        if response := getattr(e, 'response', None):
-            print(f"Response status code: {response.status_code}")
-            print(f"Response body: {response.text}")
-        return None
-
-table_data = load_table_data()
+class StarReporter:
+    def __init__(self, url, batch_size=20, flush_interval=2.0, timeout=10.0, max_retries=3,
+                 failure_threshold=5, reset_timeout=60.0, max_outbox=1000):
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.outbox = deque(maxlen=max_outbox)
+        self.wakeup = asyncio.Event()
+        self.session = None
+        self.task = None
+        self.closing = False
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def circuit_open(self):
+        return time.monotonic() < self.open_until
+
+    def enqueue(self, report):
+        self.outbox.append(report)
+        if len(self.outbox) >= self.batch_size:
+            self.wakeup.set()
+
+    def start(self):
+        self.session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(limit=self.batch_size, keepalive_timeout=60),
+        )
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while not self.closing:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        while self.outbox and not self.circuit_open:
+            batch = [self.outbox.popleft() for _ in range(min(self.batch_size, len(self.outbox)))]
+            results = await asyncio.gather(*(self.post(report) for report in batch))
+            undelivered = [report for report, delivered in zip(batch, results) if delivered is None]
+            self.outbox.extendleft(reversed(undelivered))
+
+    async def post(self, report):
+        for attempt in range(self.max_retries):
+            if self.circuit_open:
+                return None
+            try:
+                async with self.session.post(self.url, json=report) as response:
+                    if response.status < 400:
+                        self.consecutive_failures = 0
+                        self.sent += 1
+                        return True
+                    body = await response.text()
+                    if response.status != 429 and response.status < 500:
+                        print(f"Star report rejected with status {response.status}: {body}")
+                        self.failed += 1
+                        return False
+                    print(f"Star report failed with status {response.status} (attempt {attempt + 1})")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Error sending star report (attempt {attempt + 1}): {e}")
+
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                self.open_until = time.monotonic() + self.reset_timeout
+                print(f"Star reporting paused for {self.reset_timeout} seconds after {self.consecutive_failures} failures")
+                return None
+            await asyncio.sleep(0.5 * 2 ** attempt + random.uniform(0, 0.25))
+
+        self.failed += 1
+        return False
+
+    async def close(self):
+        self.closing = True
+        if self.task:
+            self.wakeup.set()
+            await self.task
+        if self.session:
+            await self.flush()
+            await self.session.close()
+
+star_reporter = StarReporter(api)
 
 world_data = [
     (1, "Members"),
@@ -365,28 +1762,168 @@ world_data = [
     (259, "Members"),
 ]
 
-all_worlds = [world for world, *_ in world_data]
-members_worlds = [world for world, status, *_ in world_data if status == "Members"]
-free_to_play_worlds = [world for world, status, *_ in world_data if status == "Free-to-play"]
-special_worlds = [world for world, status, *rest in world_data if len(rest) > 0 and rest[0] == "Special"]
-local_worlds = [world for world, status, *rest in world_data if len(rest) > 0 and rest[0] == "Local"]
+WORLD_LABELS = {
+    30: "2000 Total",
+    48: "2600 Total",
+    52: "VIP",
+    86: "1500 Total",
+    114: "1500 Total",
+    47: "Português",
+    75: "Português",
+    101: "Português Legacy",
+    94: "Português F2P",
+    251: "Português F2P",
+    118: "Français",
+    55: "Français F2P",
+    102: "Deutsch",
+    121: "Deutsch",
+    122: "Deutsch F2P",
+    18: "Legacy",
+    33: "Legacy",
+    57: "Legacy",
+    115: "Legacy",
+    120: "Legacy",
+    136: "Legacy",
+    137: "Legacy",
+}
+
+@dataclass(frozen=True, slots=True)
+class WorldInfo:
+    world: int
+    free_to_play: bool
+    local: bool
+    special: bool
+    label: str
+    status_label: str
+    f2p_label: str
+    coloured_name: str
+
+    @classmethod
+    def build(cls, world, status, *rest):
+        free_to_play = status == "Free-to-play"
+        local = len(rest) > 0 and rest[0] == "Local"
+        special = len(rest) > 0 and rest[0] == "Special"
+        name = WORLD_LABELS.get(world)
+        if name:
+            label = status_label = f" `[{name}]`"
+            f2p_label = f" `[{name.removesuffix(' F2P')}]`" if free_to_play else ""
+        else:
+            label = " `[Free-to-play]`" if free_to_play else ""
+            status_label = label or " `[Members]`"
+            f2p_label = ""
+        if special:
+            colour = 36
+        elif local and free_to_play:
+            colour = 32
+        elif local:
+            colour = 30
+        elif free_to_play:
+            colour = 33
+        else:
+            colour = 37
+        return cls(world, free_to_play, local, special, label, status_label, f2p_label, f"\u001b[{colour}m{world}\u001b[0m")
+
+world_info = {row[0]: WorldInfo.build(*row) for row in world_data}
+
+all_worlds = list(world_info)
+members_worlds = [world for world, info in world_info.items() if not info.free_to_play]
+free_to_play_worlds = [world for world, info in world_info.items() if info.free_to_play]
+special_worlds = [world for world, info in world_info.items() if info.special]
+local_worlds = [world for world, info in world_info.items() if info.local]
+free_to_play_world_set = set(free_to_play_worlds)
+coloured_world_names = {world: info.coloured_name for world, info in world_info.items()}
+
+def format_star_line(star, layout, labels="status", linked=True):
+    info = world_info[star.world]
+    if labels == "f2p":
+        tag = info.f2p_label
+    elif labels == "status":
+        tag = info.status_label
+    else:
+        tag = info.label
+    region = (region_links.get(star.region) or f"[{star.region}](<{DEFAULT_REGION_URL}>)") if linked else f"`{star.region}`"
+    if layout == "notable":
+        return f"World `{star.world}` in {region}, <t:{star.expires_at}:R> (`{star.game_time}`){tag}"
+    if layout == "world":
+        return f"World `{star.world}` {region}, <t:{star.expires_at}:R> (`{star.game_time}`).{tag}"
+    if layout == "size":
+        return f"Size `{star.size_number}` on world `{star.world}`, <t:{star.expires_at}:R> (`{star.game_time}`).{tag}"
+    return f"Size `{star.size_number}` in {region}, <t:{star.expires_at}:R> (`{star.game_time}`)."
+
+DISCORD_CHAR_LIMIT = 1800
+
+def paginate(header, stars, layout, labels="status", section=None, repeat_header=True, limit=DISCORD_CHAR_LIMIT):
+    pages = []
+    lines = [header]
+    length = len(header)
+    rows = 0
+    current = None
+    for star in stars:
+        title = section(star) if section else None
+        block = []
+        if title is not None and title != current:
+            block = ["", f"`{title}`"] if rows else [f"`{title}`"]
+            current = title
+        added = sum(len(text) + 1 for text in block) - (0 if lines else 1)
+        line = format_star_line(star, layout, labels)
+        if length + added + len(line) + 1 > limit:
+            short = format_star_line(star, layout, labels, linked=False)
+            if rows and length + added + len(short) + 1 > limit:
+                pages.append("\n".join(lines))
+                lines = [header] if repeat_header else []
+                length = len(header) if repeat_header else 0
+                rows = 0
+                block = [f"`{title}`"] if title is not None else []
+                added = sum(len(text) + 1 for text in block) - (0 if lines else 1)
+                if length + added + len(line) + 1 > limit:
+                    line = short
+            else:
+                line = short
+        lines.extend(block)
+        lines.append(line)
+        length += added + len(line) + 1
+        rows += 1
+    if rows:
+        pages.append("\n".join(lines))
+    return pages
+
+class QueryCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key, render):
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = self.results[key] = render()
+        if len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+        return result
+
+query_cache = QueryCache()
+
+guild_tables = GuildTables(AUTHORIZED_SERVER_IDS, HOST_SERVER_ID)
 
 @client.tree.command(name="lock", description="Lock the star call table to prevent modifications.")
 @app_commands.default_permissions(manage_events=True)
 @check_authorized_server()
 async def lock(interaction: discord.Interaction):
-    current_table_data = load_table_data()
-
-    if not current_table_data.get("message_id"):
+    state = guild_tables[interaction.guild_id]
+    if not state.message_id:
         await interaction.response.send_message("No table exists to lock.", ephemeral=True)
         return
     
-    if current_table_data["is_locked"]:
+    if state.is_locked:
         await interaction.response.send_message("Table is already locked.", ephemeral=True)
         return
     
-    table_data["is_locked"] = True
-    save_table_data(table_data)
+    state.set_locked(True)
 
     await interaction.response.send_message("Star call table has been locked.", ephemeral=True)
 
@@ -394,18 +1931,16 @@ async def lock(interaction: discord.Interaction):
 @app_commands.default_permissions(manage_events=True)
 @check_authorized_server()
 async def unlock(interaction: discord.Interaction):
-    current_table_data = load_table_data()
-
-    if not current_table_data.get("message_id"):
+    state = guild_tables[interaction.guild_id]
+    if not state.message_id:
         await interaction.response.send_message("No table exists to unlock.", ephemeral=True)
         return
     
-    if not current_table_data["is_locked"]:
+    if not state.is_locked:
         await interaction.response.send_message("Table is already unlocked.", ephemeral=True)
         return
     
-    table_data["is_locked"] = False
-    save_table_data(table_data)
+    state.set_locked(False)
 
     await interaction.response.send_message("Star call table has been unlocked.", ephemeral=True)
 
@@ -413,97 +1948,35 @@ async def unlock(interaction: discord.Interaction):
 @app_commands.default_permissions(manage_events=True)
 @check_authorized_server()
 async def clear(interaction: discord.Interaction):
-    if not table_data.get("chunk_message_ids"):
+    state = guild_tables[interaction.guild_id]
+    if not state.chunk_message_ids:
         await interaction.response.send_message("No table exists to clear.", ephemeral=True)
         return
     
-    if table_data["is_locked"] and not interaction.user.guild_permissions.manage_events:
+    if state.is_locked and not interaction.user.guild_permissions.manage_events:
         await interaction.response.send_message("Table is locked. Cannot clear entries.", ephemeral=True)
         return
 
+    channel = interaction.client.get_channel(state.channel_id)
+    if not channel:
+        await interaction.response.send_message("Error: Could not find the channel.", ephemeral=True)
+        return
+
     await interaction.response.defer()
     progress_message = await interaction.followup.send(
         "Starting table clear..."
     )
 
-    table_data["entries"] = [
-        {"world": world, "region": "", "size": "", "game_time": "", "game_time_full": ""} 
-        for world in all_worlds
-    ]
-
-    table_rows = []
-    for entry in table_data["entries"]:
-        world_name = entry["world"]
-        if entry["world"] in special_worlds:
-            world_name = f"\u001b[36m{world_name}\u001b[0m"
-        elif entry["world"] in local_worlds and entry["world"] in free_to_play_worlds:
-            world_name = f"\u001b[32m{world_name}\u001b[0m"
-        elif entry["world"] in local_worlds:
-            world_name = f"\u001b[30m{world_name}\u001b[0m"
-        elif entry["world"] in free_to_play_worlds:
-            world_name = f"\u001b[33m{world_name}\u001b[0m" 
-        else:
-            world_name = f"\u001b[37m{world_name}\u001b[0m"
-        
-        table_rows.append(
-            f"{world_name:<1} {entry['region']:<17} {entry['size']:<4} {entry['game_time']:<4}"
-        )
-
-    chunk_size = 32
-    chunks = [table_rows[i:i + chunk_size] for i in range(0, len(table_rows), chunk_size)]
-    channel = interaction.client.get_channel(table_data["channel_id"])
-    total_chunks = len(chunks)
+    async with state.hold_table():
+        state.maintenance.clear_all()
+        chunks = state.stale_chunks()
 
-    async def process_chunk(chunk_index: int, chunk: list) -> None:
-        max_retries = 3
-        base_delay = 12.0
-        
-        for attempt in range(max_retries):
-            try:
-                message_id = table_data["chunk_message_ids"][chunk_index]
-                message = await channel.fetch_message(message_id)
-                
-                updated_chunk = "```ansi\n" + "\n".join(chunk) + "```"
-                await message.edit(content=updated_chunk)
-                
-                return
-                
-            except discord.HTTPException as e:
-                if e.code == 429:
-                    retry_after = float(e.response.headers.get('Retry-After', 5))
-                    print(f"Rate limited on chunk {chunk_index}, waiting {retry_after} seconds")
-                    await asyncio.sleep(retry_after + 1) 
-                    base_delay = max(base_delay, retry_after + 2)
-                else:
-                    print(f"Error editing chunk {chunk_index} (attempt {attempt + 1}): {e}")
-                    await asyncio.sleep(base_delay)
-                    
-            except Exception as e:
-                print(f"Unexpected error on chunk {chunk_index} (attempt {attempt + 1}): {e}")
-                await asyncio.sleep(base_delay)
-        
-        print(f"Failed to process chunk {chunk_index} after {max_retries} attempts")
-
-    last_progress_update = time.time()
-
-    for i, chunk in enumerate(chunks):
-        await process_chunk(i, chunk)
-        
-        current_time = time.time()
-        if current_time - last_progress_update >= 5:
-            progress = f"Clearing table... ({i + 1}/{total_chunks} chunks)"
-            try:
-                await progress_message.edit(content=progress)
-                last_progress_update = current_time
-            except discord.HTTPException:
-                pass
-
-        await asyncio.sleep(12.0) 
-
-    save_table_data(table_data)
+    failed = await interaction.client.message_queue.publish(
+        state, channel, chunks, on_progress=progress_updater(progress_message, "Clearing table...")
+    )
     
     try:
-        await progress_message.edit(content="Table cleared successfully!")
+        await progress_message.edit(content=completion_message("Table cleared successfully!", failed))
     except discord.HTTPException:
         pass
 
@@ -511,342 +1984,135 @@ async def clear(interaction: discord.Interaction):
 @app_commands.default_permissions(manage_events=True)
 @check_authorized_server()
 async def clear_old(interaction: discord.Interaction):
-    if not table_data.get("chunk_message_ids"):
+    state = guild_tables[interaction.guild_id]
+    if not state.chunk_message_ids:
         await interaction.response.send_message("No table exists to clear.", ephemeral=True)
         return
     
-    if table_data["is_locked"] and not interaction.user.guild_permissions.manage_events:
+    if state.is_locked and not interaction.user.guild_permissions.manage_events:
         await interaction.response.send_message("Table is locked. Cannot clear entries.", ephemeral=True)
         return
 
+    channel = interaction.client.get_channel(state.channel_id)
+    if not channel:
+        await interaction.response.send_message("Error: Could not find the channel.", ephemeral=True)
+        return
+
     await interaction.response.defer()
     progress_message = await interaction.followup.send(
         "Starting table clear of expired entries..."
     )
 
-    current_time = datetime.datetime.now(pytz.UTC)
-    
-    new_entries = []
-    for entry in table_data["entries"]:
-        if entry["game_time_full"]:
-            try:
-                entry_time = datetime.datetime.fromisoformat(entry["game_time_full"])
-                if entry_time > current_time:
-                    new_entries.append(entry)
-                    continue
-            except ValueError:
-                pass
-        
-        new_entries.append({
-            "world": entry["world"],
-            "region": "",
-            "size": "",
-            "game_time": "",
-            "game_time_full": ""
-        })
-
-    table_data["entries"] = new_entries
-
-    table_rows = []
-    for entry in table_data["entries"]:
-        world_name = entry["world"]
-        if entry["world"] in special_worlds:
-            world_name = f"\u001b[36m{world_name}\u001b[0m"
-        elif entry["world"] in local_worlds and entry["world"] in free_to_play_worlds:
-            world_name = f"\u001b[32m{world_name}\u001b[0m"
-        elif entry["world"] in local_worlds:
-            world_name = f"\u001b[30m{world_name}\u001b[0m"
-        elif entry["world"] in free_to_play_worlds:
-            world_name = f"\u001b[33m{world_name}\u001b[0m" 
-        else:
-            world_name = f"\u001b[37m{world_name}\u001b[0m"
-        
-        table_rows.append(
-            f"{world_name:<1} {entry['region']:<17} {entry['size']:<4} {entry['game_time']:<4}"
-        )
-
-    chunk_size = 32
-    chunks = [table_rows[i:i + chunk_size] for i in range(0, len(table_rows), chunk_size)]
-    channel = interaction.client.get_channel(table_data["channel_id"])
-    total_chunks = len(chunks)
+    async with state.hold_table():
+        state.maintenance.clear_expired()
+        chunks = state.stale_chunks()
 
-    async def process_chunk(chunk_index: int, chunk: list) -> None:
-        max_retries = 3
-        base_delay = 12.0
-        
-        for attempt in range(max_retries):
-            try:
-                message_id = table_data["chunk_message_ids"][chunk_index]
-                message = await channel.fetch_message(message_id)
-                
-                updated_chunk = "```ansi\n" + "\n".join(chunk) + "```"
-                await message.edit(content=updated_chunk)
-                
-                return
-                
-            except discord.HTTPException as e:
-                if e.code == 429:
-                    retry_after = float(e.response.headers.get('Retry-After', 5))
-                    print(f"Rate limited on chunk {chunk_index}, waiting {retry_after} seconds")
-                    await asyncio.sleep(retry_after + 1) 
-                    base_delay = max(base_delay, retry_after + 2)
-                else:
-                    print(f"Error editing chunk {chunk_index} (attempt {attempt + 1}): {e}")
-                    await asyncio.sleep(base_delay)
-                    
-            except Exception as e:
-                print(f"Unexpected error on chunk {chunk_index} (attempt {attempt + 1}): {e}")
-                await asyncio.sleep(base_delay)
-        
-        print(f"Failed to process chunk {chunk_index} after {max_retries} attempts")
-
-    last_progress_update = time.time()
-
-    for i, chunk in enumerate(chunks):
-        await process_chunk(i, chunk)
-        
-        current_time = time.time()
-        if current_time - last_progress_update >= 5:
-            progress = f"Clearing expired entries... ({i + 1}/{total_chunks} chunks)"
-            try:
-                await progress_message.edit(content=progress)
-                last_progress_update = current_time
-            except discord.HTTPException:
-                pass
-
-        await asyncio.sleep(12.0) 
-
-    save_table_data(table_data)
+    failed = await interaction.client.message_queue.publish(
+        state, channel, chunks, on_progress=progress_updater(progress_message, "Clearing expired entries...")
+    )
     
     try:
-        await progress_message.edit(content="Expired entries cleared successfully!")
+        await progress_message.edit(content=completion_message("Expired entries cleared successfully!", failed))
     except discord.HTTPException:
         pass
 
 @client.tree.command(name="clear-restricted", description="Clear entries that expired over 30 minutes ago.")
 @check_authorized_server()
 async def clear_restricted(interaction: discord.Interaction):
-    is_real_interaction = hasattr(interaction.response, 'is_done')
-    
-    if is_real_interaction and not interaction.response.is_done():
+    state = guild_tables[interaction.guild_id]
+    if not interaction.response.is_done():
         await interaction.response.defer(ephemeral=True)
     
-    async with interaction.client.clear_lock:
-        if not hasattr(clear_restricted, "last_run"):
-            clear_restricted.last_run = None
-        
-        current_time = datetime.datetime.now(pytz.UTC)
-        if clear_restricted.last_run is not None:
-            time_diff = (current_time - clear_restricted.last_run).total_seconds() / 60
-            if time_diff < 5:
-                wait_time = round(5 - time_diff)
-                if is_real_interaction:
-                    await interaction.followup.send(
-                        f"In order to combat abuse, this command can only be used once every 5 minutes. Please wait `{wait_time}` minutes before invoking it again."
-                    )
-                return
-
-        if not table_data.get("chunk_message_ids"):
-            if is_real_interaction:
-                await interaction.followup.send("No table exists to clear.")
+    current_time = datetime.datetime.now(pytz.UTC)
+    if state.restricted_cleared_at is not None:
+        time_diff = (current_time - state.restricted_cleared_at).total_seconds() / 60
+        if time_diff < 5:
+            wait_time = round(5 - time_diff)
+            await interaction.followup.send(
+                f"In order to combat abuse, this command can only be used once every 5 minutes. Please wait `{wait_time}` minutes before invoking it again."
+            )
             return
 
-        if table_data["is_locked"]:
-            if is_real_interaction:
-                await interaction.followup.send("Table is locked. Cannot clear entries.")
-            return    
+    if not state.chunk_message_ids:
+        await interaction.followup.send("No table exists to clear.")
+        return
 
-        if is_real_interaction:
-            await interaction.followup.send("Clear-restricted has been invoked successfully.")
-            progress_message = await interaction.channel.send(
-                "Starting table clear of entries that expired 30 minutes ago..."
-            )
-        else:
-            progress_message = None
+    if state.is_locked:
+        await interaction.followup.send("Table is locked. Cannot clear entries.")
+        return    
 
-        clear_restricted.last_run = current_time
-        
-        new_entries = []
-        for entry in table_data["entries"]:
-            if entry["game_time_full"]:
-                try:
-                    entry_time = datetime.datetime.fromisoformat(entry["game_time_full"])
-                    if entry_time + datetime.timedelta(minutes=30) > current_time:
-                        new_entries.append(entry)
-                        continue
-                except ValueError:
-                    pass
-            
-            new_entries.append({
-                "world": entry["world"],
-                "region": "",
-                "size": "",
-                "game_time": "",
-                "game_time_full": ""
-            })
-
-        table_data["entries"] = new_entries
-
-        table_rows = []
-        for entry in table_data["entries"]:
-            world_name = entry["world"]
-            if entry["world"] in special_worlds:
-                world_name = f"\u001b[36m{world_name}\u001b[0m"
-            elif entry["world"] in local_worlds and entry["world"] in free_to_play_worlds:
-                world_name = f"\u001b[32m{world_name}\u001b[0m"
-            elif entry["world"] in local_worlds:
-                world_name = f"\u001b[30m{world_name}\u001b[0m"
-            elif entry["world"] in free_to_play_worlds:
-                world_name = f"\u001b[33m{world_name}\u001b[0m" 
-            else:
-                world_name = f"\u001b[37m{world_name}\u001b[0m"
-            
-            table_rows.append(
-                f"{world_name:<1} {entry['region']:<17} {entry['size']:<4} {entry['game_time']:<4}"
-            )
+    channel = interaction.client.get_channel(state.channel_id)
+    if not channel:
+        await interaction.followup.send("Error: Could not find the channel.")
+        return
 
-        chunk_size = 32
-        chunks = [table_rows[i:i + chunk_size] for i in range(0, len(table_rows), chunk_size)]
-        channel = interaction.client.get_channel(table_data["channel_id"])
-        total_chunks = len(chunks)
+    state.restricted_cleared_at = current_time
 
-        async def process_chunk(chunk_index: int, chunk: list) -> None:
-            max_retries = 3
-            base_delay = 24.0
-            
-            for attempt in range(max_retries):
-                try:
-                    message_id = table_data["chunk_message_ids"][chunk_index]
-                    message = await channel.fetch_message(message_id)
-                    
-                    updated_chunk = "```ansi\n" + "\n".join(chunk) + "```"
-                    
-                    await message.edit(content=updated_chunk)
-                    return
-                    
-                except discord.RateLimited as e:
-                    retry_after = e.retry_after
-                    print(f"Rate limited on chunk {chunk_index}, waiting {retry_after} seconds.")
-                    await asyncio.sleep(retry_after + 1)
-                    continue
-                    
-                except discord.HTTPException as e:
-                    print(f"HTTP Error on chunk {chunk_index} (attempt {attempt + 1}): {e}")
-                    if e.code == 429:
-                        retry_after = float(e.response.headers.get('Retry-After', base_delay))
-                        print(f"Rate limited (HTTP 429) on chunk {chunk_index}, waiting {retry_after} seconds.")
-                        await asyncio.sleep(retry_after + 1)
-                        base_delay = max(base_delay, retry_after + 2)
-                    else:
-                        await asyncio.sleep(base_delay)
-                        
-                except Exception as e:
-                    print(f"Unexpected error on chunk {chunk_index} (attempt {attempt + 1}): {str(e)}")
-                    await asyncio.sleep(base_delay)
-            
-            print(f"Failed to process chunk {chunk_index} after {max_retries} attempts")
+    async with state.hold_table():
+        state.maintenance.clear_restricted(current_time.timestamp())
+        chunks = state.stale_chunks()
 
-        last_progress_update = time.time()
-        chunks_processed = 0
-        total_chunks = len(chunks)
-        chunk_delay = 24.0 
+    await interaction.followup.send("Clear-restricted has been invoked successfully.")
+    progress_message = await interaction.channel.send(
+        "Starting table clear of entries that expired 30 minutes ago..."
+    )
 
-        for i, chunk in enumerate(chunks):
-            if i > 0:
-                await asyncio.sleep(chunk_delay)
-            
-            await process_chunk(i, chunk)
-            chunks_processed += 1
-            
-            if is_real_interaction:
-                current_time = time.time()
-                if current_time - last_progress_update >= 5:
-                    progress = f"Clearing expired entries... ({chunks_processed}/{total_chunks} chunks)"
-                    try:
-                        await progress_message.edit(content=progress)
-                        last_progress_update = current_time
-                    except discord.HTTPException as e:
-                        print(f"Failed to update progress message: {e}")
-
-        save_table_data(table_data)
-
-        if is_real_interaction:
-            try:
-                await progress_message.edit(content=f"Entries that expired over 30 minutes ago have been cleared!")
-            except discord.HTTPException as e:
-                print(f"Failed to send completion message: {e}")
+    failed = await interaction.client.message_queue.publish(
+        state, channel, chunks, on_progress=progress_updater(progress_message, "Clearing expired entries...")
+    )
+
+    try:
+        await progress_message.edit(content=completion_message("Entries that expired over 30 minutes ago have been cleared!", failed))
+    except discord.HTTPException as e:
+        print(f"Failed to send completion message: {e}")
 
 @client.tree.command(name="prune", description="Clear data for a specific world.")
 @app_commands.describe(world="What world do you plan to prune entries for?")
 @app_commands.default_permissions(manage_events=True)
 @check_authorized_server()
 async def prune(interaction: discord.Interaction, world: int):
-    if not table_data.get("chunk_message_ids"):
+    state = guild_tables[interaction.guild_id]
+    if not state.chunk_message_ids:
         await interaction.response.send_message("No table exists to prune.", ephemeral=True)
         return
     
-    if table_data["is_locked"] and not interaction.user.guild_permissions.manage_events:
+    if state.is_locked and not interaction.user.guild_permissions.manage_events:
         await interaction.response.send_message("Table is locked. Cannot prune entries.", ephemeral=True)
         return
 
-    world_index = None
-    for i, entry in enumerate(table_data["entries"]):
-        if entry["world"] == world:
-            world_index = i
-            break
-    
-    if world_index is None:
+    if world not in state.store:
         await interaction.response.send_message(f"World {world} not found.", ephemeral=True)
         return
 
-    table_data["entries"][world_index] = {
-        "world": world, "region": "", "size": "", "game_time": "", "game_time_full": ""
-    }
-
-    table_rows = []
-    for entry in table_data["entries"]:
-        world_name = entry["world"] 
-        if entry["world"] in special_worlds:
-            world_name = f"\u001b[36m{world_name}\u001b[0m"
-        elif entry["world"] in local_worlds and entry["world"] in free_to_play_worlds:
-            world_name = f"\u001b[32m{world_name}\u001b[0m"
-        elif entry["world"] in local_worlds:
-            world_name = f"\u001b[30m{world_name}\u001b[0m"
-        elif entry["world"] in free_to_play_worlds:
-            world_name = f"\u001b[33m{world_name}\u001b[0m"
-        else:
-            world_name = f"\u001b[37m{world_name}\u001b[0m"
-        
-        table_rows.append(
-            f"{world_name:<1} {entry['region']:<17} {entry['size']:<4} {entry['game_time']:<4}"
-        )
+    channel = interaction.client.get_channel(state.channel_id)
+    if not channel:
+        await interaction.response.send_message("Error: Could not find the channel.", ephemeral=True)
+        return
 
-    chunk_size = 32
-    chunks = [table_rows[i:i + chunk_size] for i in range(0, len(table_rows), chunk_size)]
+    await interaction.response.defer()
 
-    chunk_index = world_index // chunk_size
-    channel = interaction.client.get_channel(table_data["channel_id"])
-    message_id = table_data["chunk_message_ids"][chunk_index]
-    message = await channel.fetch_message(message_id)
-    
-    updated_chunk = "```ansi\n" + "\n".join(chunks[chunk_index]) + "```"
-    await message.edit(content=updated_chunk)
+    async with state.hold_chunks([state.chunk_of(world)]):
+        chunk_index = state.maintenance.prune(world)
+        published = interaction.client.message_queue.put(state, chunk_index, state.chunk_message(channel, chunk_index))
 
-    save_table_data(table_data)
+    delivered = await published
 
-    await interaction.response.send_message(f"Pruned data for world {world}.")
+    if delivered:
+        await interaction.followup.send(f"Pruned data for world {world}.")
+    else:
+        await interaction.followup.send(f"Pruned data for world {world}, but the table could not be updated.")
 
 @client.tree.command(name="create", description="Create a star call table.")
 @app_commands.default_permissions(administrator=True)
 @check_authorized_server()
 async def create(interaction: discord.Interaction):
-    if table_data["message_id"]:
+    state = guild_tables[interaction.guild_id]
+    if state.message_id:
         try:
-            channel = interaction.client.get_channel(table_data["channel_id"])
+            channel = interaction.client.get_channel(state.channel_id)
             if channel:
                 try:
-                    existing_message = await channel.fetch_message(table_data["message_id"])
-                    await channel.fetch_message(table_data["message_id"])
+                    existing_message = await channel.fetch_message(state.message_id)
                     await interaction.response.send_message(
                         f"A table already exists. Click [`here`]({existing_message.jump_url}) to view it or use `/clear` to reset its data.\nIf you wish to generate a new table, delete any part of the original.", ephemeral=True
                     )
@@ -858,48 +2124,13 @@ async def create(interaction: discord.Interaction):
 
     await interaction.response.defer(ephemeral=True)
 
-    table_rows = []
-    for world in all_worlds:
-        world_name = world 
-        if world in special_worlds:
-            world_name = f"\u001b[36m{world_name}\u001b[0m"
-        elif world in local_worlds and world in free_to_play_worlds:
-            world_name = f"\u001b[32m{world_name}\u001b[0m"
-        elif world in local_worlds:
-            world_name = f"\u001b[30m{world_name}\u001b[0m"
-        elif world in free_to_play_worlds:
-            world_name = f"\u001b[33m{world_name}\u001b[0m" 
-        else:
-            world_name = f"\u001b[37m{world_name}\u001b[0m"
-
-        table_rows.append(
-            f"{world_name:<1} {'':<17} {'':<4} {'':<4}"
-        )
-
-    chunk_size = 32 
-    chunks = [table_rows[i:i + chunk_size] for i in range(0, len(table_rows), chunk_size)]
-
-    table_data["chunk_message_ids"] = []
-
-    for i, chunk in enumerate(chunks):
-        formatted_table = "\n".join([f"{row}" for row in chunk])
+    state.begin_table(interaction.channel.id)
+    chunks = state.renderer.chunks()
 
+    for chunk in chunks:
         try:
-            table_message = await interaction.channel.send(
-                content=f"```ansi\n{formatted_table}\n```"
-            )
-
-            table_data["chunk_message_ids"].append(table_message.id)
-
-            if i == 0:
-                table_data["message_id"] = table_message.id
-                table_data["channel_id"] = interaction.channel.id
-
-                if not table_data["entries"]:
-                    table_data["entries"] = [
-                        {"world": world, "region": "", "size": "", "game_time": "", "game_time_full": ""} 
-                        for world in all_worlds
-                    ]
+            table_message = await edit_scheduler.send(interaction.channel, chunk)
+            state.add_chunk_message(table_message.id, chunk)
         except Exception as e:
             await interaction.followup.send(
                 f"Failed to create the table. Error: {str(e)}", 
@@ -907,7 +2138,7 @@ async def create(interaction: discord.Interaction):
             )
             return
     
-    save_table_data(table_data)
+    state.save()
     
     await interaction.followup.send("Table(s) created successfully!", ephemeral=True)
 
@@ -956,301 +2187,187 @@ async def create(interaction: discord.Interaction):
 )
 @check_authorized_server()
 async def call(interaction: discord.Interaction, world: int, region: str, size: str, game_time: app_commands.Range[int, 1, 128]):
+    state = guild_tables[interaction.guild_id]
     try:
         await interaction.response.defer()
     except (discord.NotFound, discord.HTTPException) as e:
         print(f"Failed to defer interaction: {e}")
         return
 
-    async with interaction.client.clear_lock:
-        if not hasattr(interaction.client, 'message_queue'):
-            interaction.client.message_queue = MessageQueue()
-            interaction.client.message_queue.start()
+    with perf.span("call.validation"):
+        if not state.message_id:
+            problem = "No table exists. Use `/create` first."
+        elif state.is_locked and not interaction.user.guild_permissions.manage_events:
+            problem = "Table is locked. Invoke `/unlock` to modify entries."
+        elif world not in state.store:
+            problem = f"World `{world}` not found."
+        else:
+            problem = None
 
-        if not table_data.get("message_id"):
-            await interaction.followup.send("No table exists. Use `/create` first.", ephemeral=True)
-            return
+    if problem:
+        await interaction.followup.send(problem, ephemeral=True)
+        return
 
-        if table_data["is_locked"] and not interaction.user.guild_permissions.manage_events:
-            await interaction.followup.send("Table is locked. Invoke `/unlock` to modify entries.", ephemeral=True)
-            return
+    try:
+        entry_updates = {}
+        if region is not None:
+            entry_updates["region"] = region
+        if size is not None:
+            entry_updates["size"] = size
+        if game_time is not None:
+            current_utc = datetime.datetime.now(pytz.UTC)
+            game_end_time = current_utc + datetime.timedelta(minutes=game_time)
+
+            entry_updates["game_time"] = game_end_time.strftime("%H:%M")
+            entry_updates["game_time_full"] = game_end_time.isoformat()
+            
+            game_time_unix = int(game_end_time.timestamp())
 
-        world_index = next((i for i, entry in enumerate(table_data["entries"]) if entry["world"] == world), None)
-        if world_index is None:
-            await interaction.followup.send(f"World `{world}` not found.", ephemeral=True)
-            return
+        with perf.span("call.lookup"):
+            channel = interaction.client.get_channel(state.channel_id)
+            chunk_index = state.chunk_of(world)
 
-        try:
-            entry_updates = {}
-            if region is not None:
-                entry_updates["region"] = region
-            if size is not None:
-                entry_updates["size"] = size
-            if game_time is not None:
-                current_utc = datetime.datetime.now(pytz.UTC)
-                game_end_time = current_utc + datetime.timedelta(minutes=game_time)
-
-                entry_updates["game_time"] = game_end_time.strftime("%H:%M")
-                entry_updates["game_time_full"] = game_end_time.isoformat()
-                
-                game_time_unix = int(game_end_time.timestamp())
+        if not channel:
+            await interaction.followup.send("Error: Could not find the channel.", ephemeral=True)
+            return
 
-            table_data["entries"][world_index].update(entry_updates)
+        async with state.hold_chunks([chunk_index]):
+            with perf.span("call.enqueue"):
+                state.update_entry(world, **entry_updates)
+                segment_missing = state.chunk_message_ids[chunk_index] in state.missing_message_ids
+                if not segment_missing:
+                    interaction.client.message_queue.put(
+                        state, chunk_index, state.chunk_message(channel, chunk_index), interaction.created_at.timestamp()
+                    )
+            with perf.span("call.save"):
+                state.save()
 
-            channel = interaction.client.get_channel(table_data["channel_id"])
-            if not channel:
-                await interaction.followup.send("Error: Could not find the channel.", ephemeral=True)
-                return
+        if datetime.datetime.now(datetime.timezone.utc) >= interaction.expires_at:
+            print(f"Interaction expired for user {interaction.user.id} - command for world {world} completed silently.")
+            return
 
-            if datetime.datetime.now(datetime.timezone.utc) >= interaction.expires_at:
-                print(f"Interaction expired for user {interaction.user.id} - command for world {world} completed silently.")
-                return
+        if segment_missing:
+            await interaction.followup.send("Error: Table segment not found. It may have been deleted.", ephemeral=True)
+            return
 
-            table_rows = []
-            for entry in table_data["entries"]:
-                world_name = entry["world"]
-                if entry["world"] in special_worlds:
-                    world_name = f"\u001b[36m{world_name}\u001b[0m"
-                elif entry["world"] in local_worlds and entry["world"] in free_to_play_worlds:
-                    world_name = f"\u001b[32m{world_name}\u001b[0m"
-                elif entry["world"] in local_worlds:
-                    world_name = f"\u001b[30m{world_name}\u001b[0m"
-                elif entry["world"] in free_to_play_worlds:
-                    world_name = f"\u001b[33m{world_name}\u001b[0m"
-                else:
-                    world_name = f"\u001b[37m{world_name}\u001b[0m"
+        with perf.span("call.followup"):
+            await interaction.followup.send(
+                f"Spotted a `{size}` star in `{region}` on world `{world}`!\n"
+                f"It will fall <t:{game_time_unix}:R> (`{entry_updates['game_time']}`)."
+            )
 
-                table_rows.append(
-                    f"{world_name:<1} {entry['region']:<17} {entry['size']:<4} {entry['game_time']:<4}"
-                )
+        if is_valid_size(size):
+            try:
+                size_number = int(size.lstrip('s'))
+                data = {
+                    "world": world,
+                    "location": region,
+                    "createdBy": str(interaction.user.id),
+                    "time": game_time_unix,
+                    "size": size_number
+                }
+                #star_reporter.enqueue(data)
+            except Exception as api_error:
+                #print(f"API Error occurred while queueing star report: {api_error}")
+                pass
 
-            chunk_size = 32
-            chunks = [table_rows[i:i + chunk_size] for i in range(0, len(table_rows), chunk_size)]
-            chunk_index = world_index // chunk_size
+    except discord.NotFound as e:
+        if "Unknown Webhook" in str(e):
+            print(f"Interaction webhook expired - command execution still continued for user {interaction.user.id}")
+            print(f"Error: {str(e)}")
+        elif "Unknown interaction" in str(e):
+            print(f"Interaction expired for user {interaction.user.id}")
+            print(f"Error: {str(e)}")
+        else:
+            print(f"Error: {str(e)}")
+    except discord.HTTPException as e:
+        print(f"Error executing call command: {str(e)}")
+        try:
+            await interaction.followup.send(f"Error updating message: {str(e)}", ephemeral=True)
+        except:
+            print(f"Couldn't send error notification to user {interaction.user.id}")
+    except Exception as e:
+        print(f"Error executing call command: {str(e)}")
+        try:
+            await interaction.user.send(f"An error occurred with your command: {str(e)}")
+        except:
+            print(f"Couldn't send error notification to user {interaction.user.id}")
 
-            message_id = table_data["chunk_message_ids"][chunk_index]
-            
-            try:
-                message = await channel.fetch_message(message_id)
-            except discord.NotFound:
-                await interaction.followup.send("Error: Table segment not found. It may have been deleted.", ephemeral=True)
-                return
+@client.tree.command(name="perf", description="Report command stage timings and capture a profile.")
+@app_commands.describe(
+    capture="Optionally profile the bot for a while and attach the results.",
+    seconds="How many seconds to capture for.",
+)
+@app_commands.choices(
+    capture=[
+        app_commands.Choice(name="cProfile", value="cprofile"),
+        app_commands.Choice(name="tracemalloc", value="tracemalloc"),
+    ]
+)
+@app_commands.default_permissions(administrator=True)
+@check_authorized_server()
+async def perf_command(interaction: discord.Interaction, capture: str = None, seconds: app_commands.Range[int, 1, 300] = 30):
+    await interaction.response.defer(ephemeral=True)
 
-            updated_chunk = "```ansi\n" + "\n".join(chunks[chunk_index]) + "```"
-            
-            if message:
-                await interaction.client.message_queue.queue.put((message, updated_chunk))
+    report = perf.report()
+    summary = f"```\n{report}\n```" if len(report) < 1900 else "Stage timings are attached."
+    files = [] if len(report) < 1900 else [discord.File(io.BytesIO(report.encode()), filename="stages.txt")]
 
-            save_table_data(table_data)
+    if capture is None:
+        await interaction.followup.send(summary, files=files, ephemeral=True)
+        return
 
-            await interaction.followup.send(
-                f"Spotted a `{size}` star in `{region}` on world `{world}`!\n"
-                f"It will fall <t:{game_time_unix}:R> (`{entry_updates['game_time']}`)."
-            )
+    if perf.capturing:
+        await interaction.followup.send(f"{summary}\nA capture is already running.", files=files, ephemeral=True)
+        return
 
-            if is_valid_size(size):
-                try:
-                    size_number = int(size.lstrip('s'))
-                    data = {
-                        "world": world,
-                        "location": region,
-                        "createdBy": str(interaction.user.id),
-                        "time": game_time_unix,
-                        "size": size_number
-                    }
-                    #response_data = make_post_request(api, data)
-                except Exception as api_error:
-                    #print(f"API Error occurred while reporting star: {api_error}")
-                    #print(f"API Data: {response_data}")
-                    pass
+    perf.capturing = True
+    try:
+        if capture == "cprofile":
+            result, filename = await perf.profile(seconds), "cprofile.txt"
+        else:
+            result, filename = await perf.trace_allocations(seconds), "tracemalloc.txt"
+    finally:
+        perf.capturing = False
 
-        except discord.NotFound as e:
-            if "Unknown Webhook" in str(e):
-                print(f"Interaction webhook expired - command execution still continued for user {interaction.user.id}")
-                print(f"Error: {str(e)}")
-            elif "Unknown interaction" in str(e):
-                print(f"Interaction expired for user {interaction.user.id}")
-                print(f"Error: {str(e)}")
-            else:
-                print(f"Error: {str(e)}")
-        except discord.HTTPException as e:
-            print(f"Error executing call command: {str(e)}")
-            try:
-                await interaction.followup.send(f"Error updating message: {str(e)}", ephemeral=True)
-            except:
-                print(f"Couldn't send error notification to user {interaction.user.id}")
-        except Exception as e:
-            print(f"Error executing call command: {str(e)}")
-            try:
-                await interaction.user.send(f"An error occurred with your command: {str(e)}")
-            except:
-                print(f"Couldn't send error notification to user {interaction.user.id}")
+    files.append(discord.File(io.BytesIO(result.encode()), filename=filename))
+    await interaction.followup.send(summary, files=files, ephemeral=True)
 
 @client.tree.command(name="find", description="Find the highest size stars currently in the table.")
 async def find(interaction: discord.Interaction):
+    state = guild_tables.for_reading(interaction.guild_id)
     try:
         await interaction.response.defer()
         
-        if not table_data.get("chunk_message_ids"):
+        if not state.chunk_message_ids:
             await interaction.followup.send("Table does not exist. Use `/create` first.", ephemeral=True)
             return
 
-        valid_entries = [
-            entry for entry in table_data["entries"]
-            if entry['size'] != "" and
-            entry['region'] != "" and
-            entry['game_time'] != "" and
-            entry['game_time_full'] != "" and
-            is_valid_size(entry['size']) and
-            is_valid_game_time(entry['game_time']) and
-            is_valid_game_time_full(entry['game_time_full'])
-        ]
-
-        if not valid_entries:
-            await interaction.followup.send("No stars have been fully called yet.")
-            return
+        with perf.span("find.lookup"):
+            snapshot = state.snapshot()
 
-        def extract_size(entry):
-            return int(entry['size'][1:])
+        def render():
+            top_sizes = snapshot.sizes[:2]
 
-        max_size = max(extract_size(entry) for entry in valid_entries)
-        smaller_sizes = [size for size in [extract_size(entry) for entry in valid_entries] if size < max_size]
+            if not top_sizes:
+                return ["No stars have been fully called yet."]
 
-        if smaller_sizes:
-            second_max_size = max(smaller_sizes)
             found_entries = [
-                entry for entry in valid_entries 
-                if extract_size(entry) in [max_size, second_max_size]
+                entry for size in top_sizes
+                for entry in snapshot.with_size(size)
             ]
-        else:
-            found_entries = [
-                entry for entry in valid_entries 
-                if extract_size(entry) == max_size
-            ]
-
-        found_entries.sort(key=extract_size, reverse=True)
-
-        star_details = []
-        current_size = None
-        
-        for star in found_entries:
-            game_time_unix = int(datetime.datetime.fromisoformat(star['game_time_full']).timestamp())
-            world_status = ""
-            match star['world']:
-                case 30:
-                    world_status = " `[2000 Total]`"
-                case 48:
-                    world_status = " `[2600 Total]`"
-                case 52:
-                    world_status = " `[VIP]`"
-                case 86 | 114:
-                    world_status = " `[1500 Total]`"
-                case 47 | 75:
-                    world_status = " `[Português]`"
-                case 101:
-                    world_status = " `[Português Legacy]`"
-                case 94 | 251:
-                    world_status = " `[Português F2P]`"
-                case 118:
-                    world_status = " `[Français]`"
-                case 55:
-                    world_status = " `[Français F2P]`"
-                case 102 | 121:
-                    world_status = " `[Deutsch]`"
-                case 122:
-                    world_status = " `[Deutsch F2P]`"
-                case 18 | 33 | 57 | 115 | 120 | 136 | 137:
-                    world_status = " `[Legacy]`"
-                case _:
-                    if star['world'] in free_to_play_worlds:
-                        world_status = " `[Free-to-play]`"
-                    else:
-                        world_status = ""
 
-            size = extract_size(star)
-            if size != current_size:
-                star_details.append(f"\n`Size {size}:`")
-                current_size = size
-                
-            try:
-                region_link = get_region_url(star['region'])
-                region_display = f"[{star['region']}](<{region_link}>)"
-            except Exception:
-                region_display = f"`{star['region']}`"
-            
-            star_details.append(
-                f"World `{star['world']}` in {region_display}, <t:{game_time_unix}:R> (`{star['game_time']}`){world_status}"
+            return paginate(
+                "⁂ Notable stars found:", found_entries, "notable", "full",
+                section=lambda star: f"Size {star.size_number}:", repeat_header=False
             )
 
-        DISCORD_CHAR_LIMIT = 1800
-        header = "⁂ Notable stars found:"
-        messages = []
-        current_message = header
+        with perf.span("find.render"):
+            messages = query_cache.lookup(("find", None, state.guild_id, snapshot.version), render)
 
-        message = header + "\n".join(star_details)
-        if len(message) > DISCORD_CHAR_LIMIT:
-            star_details = []
-            current_size = None
-            
-            for star in found_entries:
-                game_time_unix = int(datetime.datetime.fromisoformat(star['game_time_full']).timestamp())
-                world_status = ""
-                match star['world']:
-                    case 30:
-                        world_status = " `[2000 Total]`"
-                    case 48:
-                        world_status = " `[2600 Total]`"
-                    case 52:
-                        world_status = " `[VIP]`"
-                    case 86 | 114:
-                        world_status = " `[1500 Total]`"
-                    case 47 | 75:
-                        world_status = " `[Português]`"
-                    case 101:
-                        world_status = " `[Português Legacy]`"
-                    case 94 | 251:
-                        world_status = " `[Português F2P]`"
-                    case 118:
-                        world_status = " `[Français]`"
-                    case 55:
-                        world_status = " `[Français F2P]`"
-                    case 102 | 121:
-                        world_status = " `[Deutsch]`"
-                    case 122:
-                        world_status = " `[Deutsch F2P]`"
-                    case 18 | 33 | 57 | 115 | 120 | 136 | 137:
-                        world_status = " `[Legacy]`"
-                    case _:
-                        if star['world'] in free_to_play_worlds:
-                            world_status = " `[Free-to-play]`"
-                        else:
-                            world_status = ""
-
-                size = extract_size(star)
-                if size != current_size:
-                    star_details.append(f"\n`Size {size}:`")
-                    current_size = size
-
-                star_details.append(
-                    f"World `{star['world']}` in `{star['region']}`, <t:{game_time_unix}:R> (`{star['game_time']}`){world_status}"
-                )
-
-            for detail in star_details:
-                if len(current_message + detail + "\n") > DISCORD_CHAR_LIMIT:
-                    messages.append(current_message)
-                    current_message = f"`Size {size}:`" + "\n" + detail + "\n"
-                else:
-                    current_message += detail + "\n"
-            
-            if current_message != header:
-                messages.append(current_message)
-        else:
-            messages = [message]
-
-        await interaction.followup.send(messages[0])
-        
-        for message in messages[1:]:
-            await interaction.followup.send(message)
+        with perf.span("find.followup"):
+            for message in messages:
+                await interaction.followup.send(message)
             
     except Exception as e:
         print(f"Error in find command: {e}")
@@ -1276,87 +2393,32 @@ async def find(interaction: discord.Interaction):
     ]
 )
 async def find_size(interaction: discord.Interaction, size: str):
+    state = guild_tables.for_reading(interaction.guild_id)
     try:
         await interaction.response.defer(ephemeral=True)
         
-        if not table_data.get("chunk_message_ids"):
+        if not state.chunk_message_ids:
             await interaction.followup.send("Table does not exist. Use `/create` first.", ephemeral=True)
             return
             
-        valid_entries = [
-            entry for entry in table_data["entries"]
-            if entry['size'] == size and
-               entry['region'] != "" and
-               entry['game_time'] != "" and
-               entry['game_time_full'] != "" and
-               is_valid_size(entry['size']) and
-               is_valid_game_time(entry['game_time']) and
-               is_valid_game_time_full(entry['game_time_full'])
-        ]
-        
-        if not valid_entries:
-            await interaction.followup.send(f"No stars of size `{size[1:]}` have been fully called yet.", ephemeral=True)
-            return
-            
-        star_details = []
-        for star in valid_entries:
-            game_time_unix = int(datetime.datetime.fromisoformat(star['game_time_full']).timestamp())
-            world_status = ""
-            match star['world']:
-                case 30:
-                    world_status = " `[2000 Total]`"
-                case 48:
-                    world_status = " `[2600 Total]`"
-                case 52:
-                    world_status = " `[VIP]`"
-                case 86 | 114:
-                    world_status = " `[1500 Total]`"
-                case 47 | 75:
-                    world_status = " `[Português]`"
-                case 101:
-                    world_status = " `[Português Legacy]`"
-                case 94 | 251:
-                    world_status = " `[Português F2P]`"
-                case 118:
-                    world_status = " `[Français]`"
-                case 55:
-                    world_status = " `[Français F2P]`"
-                case 102 | 121:
-                    world_status = " `[Deutsch]`"
-                case 122:
-                    world_status = " `[Deutsch F2P]`"
-                case 18 | 33 | 57 | 115 | 120 | 136 | 137:
-                    world_status = " `[Legacy]`"
-                case _:
-                    if star['world'] in free_to_play_worlds:
-                        world_status = " `[Free-to-play]`"
-                    else:
-                        world_status = " `[Members]`"
-                        
-            star_details.append(
-                f"World `{star['world']}` [{star['region']}](<{get_region_url(star['region'])}>), <t:{game_time_unix}:R> (`{star['game_time']}`).{world_status}"
-            )
-            
-        header = f"Star(s) of size `{size[1:]}` called:\n"
-       
-        DISCORD_CHAR_LIMIT = 1800
-        messages = []
-        current_message = header
-       
-        for detail in star_details:
-            if len(current_message + detail + "\n") > DISCORD_CHAR_LIMIT:
-                messages.append(current_message)
-                current_message = header + detail + "\n"
-            else:
-                current_message += detail + "\n"
-       
-        if current_message != header:
-            messages.append(current_message)
+        with perf.span("find-size.lookup"):
+            snapshot = state.snapshot()
+
+        def render():
+            valid_entries = snapshot.with_size(int(size[1:]))
             
-        await interaction.followup.send(messages[0], ephemeral=True)
+            if not valid_entries:
+                return [f"No stars of size `{size[1:]}` have been fully called yet."]
+                
+            header = f"Star(s) of size `{size[1:]}` called:"
+            return paginate(header, valid_entries, "world", "status")
+
+        with perf.span("find-size.render"):
+            messages = query_cache.lookup(("find-size", size, state.guild_id, snapshot.version), render)
        
-        for message in messages[1:]:
-            await interaction.followup.send(message, ephemeral=True)
+        with perf.span("find-size.followup"):
+            for message in messages:
+                await interaction.followup.send(message, ephemeral=True)
             
     except Exception as e:
         print(f"Error in find_size command for size {size}: {str(e)}")
@@ -1388,86 +2450,32 @@ async def find_size(interaction: discord.Interaction, size: str):
     ]
 )
 async def find_region(interaction: discord.Interaction, region: str):
+    state = guild_tables.for_reading(interaction.guild_id)
     try:
         await interaction.response.defer(ephemeral=True)
         
-        if not table_data.get("chunk_message_ids"):
+        if not state.chunk_message_ids:
             await interaction.followup.send("Table does not exist. Use `/create` first.", ephemeral=True)
             return
             
-        valid_entries = [
-            entry for entry in table_data["entries"]
-            if entry['region'] == region and
-               entry['size'] != "" and
-               entry['game_time'] != "" and
-               entry['game_time_full'] != "" and
-               is_valid_size(entry['size']) and
-               is_valid_game_time(entry['game_time']) and
-               is_valid_game_time_full(entry['game_time_full'])
-        ]
-        
-        if not valid_entries:
-            await interaction.followup.send(f"No stars in `{region}` have been fully called yet.", ephemeral=True)
-            return
-            
-        star_details = []
-        for star in valid_entries:
-            game_time_unix = int(datetime.datetime.fromisoformat(star['game_time_full']).timestamp())
-            world_status = ""
-            match star['world']:
-                case 30:
-                    world_status = " `[2000 Total]`"
-                case 48:
-                    world_status = " `[2600 Total]`"
-                case 52:
-                    world_status = " `[VIP]`"
-                case 86 | 114:
-                    world_status = " `[1500 Total]`"
-                case 47 | 75:
-                    world_status = " `[Português]`"
-                case 101:
-                    world_status = " `[Português Legacy]`"
-                case 94 | 251:
-                    world_status = " `[Português F2P]`"
-                case 118:
-                    world_status = " `[Français]`"
-                case 55:
-                    world_status = " `[Français F2P]`"
-                case 102 | 121:
-                    world_status = " `[Deutsch]`"
-                case 122:
-                    world_status = " `[Deutsch F2P]`"
-                case 18 | 33 | 57 | 115 | 120 | 136 | 137:
-                    world_status = " `[Legacy]`"
-                case _:
-                    if star['world'] in free_to_play_worlds:
-                        world_status = " `[Free-to-play]`"
-                    else:
-                        world_status = " `[Members]`"
-                        
-            star_details.append(
-                f"Size `{star['size'][1:]}` on world `{star['world']}`, <t:{game_time_unix}:R> (`{star['game_time']}`).{world_status}"
-            )
-            
-        header = f"Star(s) called for [{region}](<{get_region_url(region)}>):\n"
-        DISCORD_CHAR_LIMIT = 1800
-        messages = []
-        current_message = header
-       
-        for detail in star_details:
-            if len(current_message + detail + "\n") > DISCORD_CHAR_LIMIT:
-                messages.append(current_message)
-                current_message = header + detail + "\n"
-            else:
-                current_message += detail + "\n"
-       
-        if current_message != header:
-            messages.append(current_message)
+        with perf.span("find-region.lookup"):
+            snapshot = state.snapshot()
+
+        def render():
+            valid_entries = snapshot.in_region(region)
             
-        await interaction.followup.send(messages[0], ephemeral=True)
+            if not valid_entries:
+                return [f"No stars in `{region}` have been fully called yet."]
+                
+            header = f"Star(s) called for [{region}](<{get_region_url(region)}>):"
+            return paginate(header, valid_entries, "size", "status")
+
+        with perf.span("find-region.render"):
+            messages = query_cache.lookup(("find-region", region, state.guild_id, snapshot.version), render)
        
-        for message in messages[1:]:
-            await interaction.followup.send(message, ephemeral=True)
+        with perf.span("find-region.followup"):
+            for message in messages:
+                await interaction.followup.send(message, ephemeral=True)
             
     except Exception as e:
         print(f"Error in find_region command for region {region}: {str(e)}")
@@ -1479,178 +2487,68 @@ async def find_region(interaction: discord.Interaction, region: str):
 @client.tree.command(name="find-world", description="Find stars on a specific world.")
 @app_commands.describe(world="What world are you looking for stars in?")
 async def find_world(interaction: discord.Interaction, world: int):
-    if not table_data.get("chunk_message_ids"):
+    state = guild_tables.for_reading(interaction.guild_id)
+    if not state.chunk_message_ids:
         await interaction.response.send_message("Table does not exist. Use `/create` first.", ephemeral=True)
         return
     
-    if not any(entry["world"] == world for entry in table_data["entries"]):
-        await interaction.response.send_message(f"World `{world}` not found.", ephemeral=True)
-        return
+    with perf.span("find-world.lookup"):
+        snapshot = state.snapshot()
 
-    valid_entries = [
-        entry for entry in table_data["entries"]
-        if entry['world'] == world and
-        entry['size'] != "" and
-        entry['region'] != "" and
-        entry['game_time'] != "" and
-        entry['game_time_full'] != "" and
-        is_valid_size(entry['size']) and
-        is_valid_game_time(entry['game_time']) and
-        is_valid_game_time_full(entry['game_time_full'])
-    ]
+    def render():
+        if world not in snapshot:
+            return f"World `{world}` not found."
 
-    if not valid_entries:  
-        await interaction.response.send_message(
-            f"No stars have been called on world `{world}`.", 
-            ephemeral=True
-        )
-        return
+        valid_entries = [
+            entry for entry in [snapshot.get(world)]
+            if entry.called
+        ]
 
-    star_details = []
-    for star in valid_entries:
-        game_time_unix = int(datetime.datetime.fromisoformat(star['game_time_full']).timestamp())
-        world_status = ""
-        match star['world']:
-            case 30:
-                world_status = " `[2000 Total]`"
-            case 48:
-                world_status = " `[2600 Total]`"
-            case 52:
-                world_status = " `[VIP]`"
-            case 86 | 114:
-                world_status = " `[1500 Total]`"
-            case 47 | 75:
-                world_status = " `[Português]`"
-            case 101:
-                world_status = " `[Português Legacy]`"
-            case 94 | 251:
-                world_status = " `[Português F2P]`"
-            case 118:
-                world_status = " `[Français]`"
-            case 55:
-                world_status = " `[Français F2P]`"
-            case 102 | 121:
-                world_status = " `[Deutsch]`"
-            case 122:
-                world_status = " `[Deutsch F2P]`"
-            case 18 | 33 | 57 | 115 | 120 | 136 | 137:
-                world_status = " `[Legacy]`"
-            case _:
-                if star['world'] in free_to_play_worlds:
-                    world_status = " `[Free-to-play]`"
-                else:
-                    world_status = " `[Members]`"
+        if not valid_entries:  
+            return f"No stars have been called on world `{world}`."
 
-        star_details.append(
-            f"Size `{star['size'][1:]}` in [{star['region']}](<{get_region_url(star['region'])}>), <t:{game_time_unix}:R> (`{star['game_time']}`)."
-        )
+        world_status = world_info[world].status_label
+        star_details = [format_star_line(star, "region") for star in valid_entries]
 
-    await interaction.response.send_message(
-        f"World `{world}`{world_status}:\n" +
-        "\n".join(star_details),
-        ephemeral=True
-    )
+        return f"World `{world}`{world_status}:\n" + "\n".join(star_details)
+
+    with perf.span("find-world.render"):
+        message = query_cache.lookup(("find-world", world, state.guild_id, snapshot.version), render)
+
+    with perf.span("find-world.followup"):
+        await interaction.response.send_message(message, ephemeral=True)
 
 @client.tree.command(name="find-f2p", description="Find the highest size f2p stars currently in the table.")
 async def find_f2p(interaction: discord.Interaction):
+    state = guild_tables.for_reading(interaction.guild_id)
     try:
         await interaction.response.defer()
         
-        if not table_data.get("chunk_message_ids"):
+        if not state.chunk_message_ids:
             await interaction.followup.send("Table does not exist. Use `/create` first.", ephemeral=True)
             return
             
-        valid_entries = [
-            entry for entry in table_data["entries"]
-            if entry['size'] != "" and
-            entry['region'] != "" and
-            entry['game_time'] != "" and
-            entry['game_time_full'] != "" and
-            is_valid_size(entry['size']) and
-            is_valid_game_time(entry['game_time']) and
-            is_valid_game_time_full(entry['game_time_full']) and
-            int(entry['world']) in free_to_play_worlds
-        ]
-        
-        if not valid_entries:
-            await interaction.followup.send("No stars have been fully called in free-to-play worlds yet.")
-            return
-            
-        def extract_size(entry):
-            return int(entry['size'][1:])
-            
-        max_size = max(extract_size(entry) for entry in valid_entries)
-        highest_stars = [
-            entry for entry in valid_entries
-            if extract_size(entry) == max_size
-        ]
-        
-        header = f"Largest free-to-play star(s) called is of size `{max_size}`:\n"
-       
-        star_details = []
-        for star in highest_stars:
-            game_time_unix = int(datetime.datetime.fromisoformat(star['game_time_full']).timestamp())
-            world_status = ""
-            match star['world']:
-                case 94 | 251:
-                    world_status = " `[Português]`"
-                case 55:
-                    world_status = " `[Français]`"
-                case 122:
-                    world_status = " `[Deutsch]`"
-                case 33 | 57 | 120 | 136:
-                    world_status = " `[Legacy]`"
-            try:
-                region_link = get_region_url(star['region'])
-                region_display = f"[{star['region']}](<{region_link}>)"
-            except Exception:
-                region_display = f"`{star['region']}`"
-           
-            star_details.append(
-                f"World `{star['world']}` {region_display}, <t:{game_time_unix}:R> (`{star['game_time']}`).{world_status}"
-            )
-            
-        DISCORD_CHAR_LIMIT = 1800
-        message = header + "\n".join(star_details)
-        if len(message) > DISCORD_CHAR_LIMIT:
-            star_details = []
-            for star in highest_stars:
-                game_time_unix = int(datetime.datetime.fromisoformat(star['game_time_full']).timestamp())
-                world_status = ""
-                match star['world']:
-                    case 94 | 251:
-                        world_status = " `[Português]`"
-                    case 55:
-                        world_status = " `[Français]`"
-                    case 122:
-                        world_status = " `[Deutsch]`"
-                    case 33 | 57 | 120 | 136:
-                        world_status = " `[Legacy]`"
-                star_details.append(
-                    f"World `{star['world']}` `{star['region']}`, <t:{game_time_unix}:R> (`{star['game_time']}`).{world_status}"
-                )
-            message = header + "\n".join(star_details)
+        with perf.span("find-f2p.lookup"):
+            snapshot = state.snapshot()
+
+        def render():
+            top_sizes = snapshot.free_to_play_sizes[:1]
             
-        if len(message) > DISCORD_CHAR_LIMIT:
-            messages = []
-            current_message = header
-           
-            for detail in star_details:
-                if len(current_message + detail + "\n") > DISCORD_CHAR_LIMIT:
-                    messages.append(current_message)
-                    current_message = header + detail + "\n"
-                else:
-                    current_message += detail + "\n"
-           
-            if current_message != header:
-                messages.append(current_message)
-        else:
-            messages = [message]
+            if not top_sizes:
+                return ["No stars have been fully called in free-to-play worlds yet."]
+                
+            max_size = top_sizes[0]
+            highest_stars = snapshot.free_to_play_with_size(max_size)
             
-        await interaction.followup.send(messages[0])
+            header = f"Largest free-to-play star(s) called is of size `{max_size}`:"
+            return paginate(header, highest_stars, "world", "f2p")
+
+        with perf.span("find-f2p.render"):
+            messages = query_cache.lookup(("find-f2p", None, state.guild_id, snapshot.version), render)
        
-        for message in messages[1:]:
-            await interaction.followup.send(message)
+        with perf.span("find-f2p.followup"):
+            for message in messages:
+                await interaction.followup.send(message)
             
     except Exception as e:
         print(f"Error in find_f2p command: {e}")
@@ -1671,67 +2569,32 @@ async def find_f2p(interaction: discord.Interaction):
     ]
 )
 async def find_size_f2p(interaction: discord.Interaction, size: str):
+    state = guild_tables.for_reading(interaction.guild_id)
     try:
         await interaction.response.defer(ephemeral=True)
         
-        if not table_data.get("chunk_message_ids"):
+        if not state.chunk_message_ids:
             await interaction.followup.send("Table does not exist. Use `/create` first.", ephemeral=True)
             return
             
-        valid_entries = [
-            entry for entry in table_data["entries"]
-            if entry['size'] == size and
-               entry['region'] != "" and
-               entry['game_time'] != "" and
-               entry['game_time_full'] != "" and
-               is_valid_size(entry['size']) and
-               is_valid_game_time(entry['game_time']) and
-               is_valid_game_time_full(entry['game_time_full']) and
-               int(entry['world']) in free_to_play_worlds
-        ]
-        
-        if not valid_entries:
-            await interaction.followup.send(f"No stars of size `{size[1:]}` have been fully called yet.", ephemeral=True)
-            return
-            
-        star_details = []
-        for star in valid_entries:
-            game_time_unix = int(datetime.datetime.fromisoformat(star['game_time_full']).timestamp())
-            world_status = ""
-            match star['world']:
-                case 94 | 251:
-                    world_status = " `[Português]`"
-                case 55:
-                    world_status = " `[Français]`"
-                case 122:
-                    world_status = " `[Deutsch]`"
-                case 33 | 57 | 120 | 136:
-                    world_status = " `[Legacy]`"
-                   
-            star_details.append(
-                f"World `{star['world']}` [{star['region']}](<{get_region_url(star['region'])}>), <t:{game_time_unix}:R> (`{star['game_time']}`).{world_status}"
-            )
-            
-        header = f"Free-to-play star(s) of size `{size[1:]}` called:\n"
-       
-        DISCORD_CHAR_LIMIT = 1800
-        messages = []
-        current_message = header
-       
-        for detail in star_details:
-            if len(current_message + detail + "\n") > DISCORD_CHAR_LIMIT:
-                messages.append(current_message)
-                current_message = header + detail + "\n"
-            else:
-                current_message += detail + "\n"
-       
-        if current_message != header:
-            messages.append(current_message)
+        with perf.span("find-size-f2p.lookup"):
+            snapshot = state.snapshot()
+
+        def render():
+            valid_entries = snapshot.free_to_play_with_size(int(size[1:]))
             
-        await interaction.followup.send(messages[0], ephemeral=True)
+            if not valid_entries:
+                return [f"No stars of size `{size[1:]}` have been fully called yet."]
+                
+            header = f"Free-to-play star(s) of size `{size[1:]}` called:"
+            return paginate(header, valid_entries, "world", "f2p")
+
+        with perf.span("find-size-f2p.render"):
+            messages = query_cache.lookup(("find-size-f2p", size, state.guild_id, snapshot.version), render)
        
-        for message in messages[1:]:
-            await interaction.followup.send(message, ephemeral=True)
+        with perf.span("find-size-f2p.followup"):
+            for message in messages:
+                await interaction.followup.send(message, ephemeral=True)
             
     except Exception as e:
         print(f"Error in find_size_f2p: {e}")
@@ -1755,65 +2618,35 @@ async def find_size_f2p(interaction: discord.Interaction, size: str):
     ]
 )
 async def find_region_f2p(interaction: discord.Interaction, region: str):
+    state = guild_tables.for_reading(interaction.guild_id)
     try:
         await interaction.response.defer(ephemeral=True)
         
-        if not table_data.get("chunk_message_ids"):
+        if not state.chunk_message_ids:
             await interaction.followup.send("Table does not exist. Use `/create` first.", ephemeral=True)
             return
             
-        valid_entries = [
-            entry for entry in table_data["entries"]
-            if entry['region'] == region and
-               entry['size'] != "" and
-               entry['game_time'] != "" and
-               entry['game_time_full'] != "" and
-               is_valid_size(entry['size']) and
-               is_valid_game_time(entry['game_time']) and
-               is_valid_game_time_full(entry['game_time_full']) and
-               int(entry['world']) in free_to_play_worlds
-        ]
-        
-        if not valid_entries:
-            await interaction.followup.send(f"No stars in `{region}` have been fully called yet.", ephemeral=True)
-            return
-            
-        star_details = []
-        for star in valid_entries:
-            game_time_unix = int(datetime.datetime.fromisoformat(star['game_time_full']).timestamp())
-            world_status = ""
-            match star['world']:
-                case 94 | 251:
-                    world_status = " `[Português]`"
-                case 55:
-                    world_status = " `[Français]`"
-                case 122:
-                    world_status = " `[Deutsch]`"
-                case 33 | 57 | 120 | 136:
-                    world_status = " `[Legacy]`"
-            star_details.append(
-                f"Size `{star['size'][1:]}` on world `{star['world']}`, <t:{game_time_unix}:R> (`{star['game_time']}`).{world_status}"
-            )
-            
-        header = f"Free-to-play star(s) called for [{region}](<{get_region_url(region)}>):\n"
-        DISCORD_CHAR_LIMIT = 1800
-        messages = []
-        current_message = header
-       
-        for detail in star_details:
-            if len(current_message + detail + "\n") > DISCORD_CHAR_LIMIT:
-                messages.append(current_message)
-                current_message = header + detail + "\n"
-            else:
-                current_message += detail + "\n"
-       
-        if current_message != header:
-            messages.append(current_message)
+        with perf.span("find-region-f2p.lookup"):
+            snapshot = state.snapshot()
+
+        def render():
+            valid_entries = [
+                entry for entry in snapshot.in_region(region)
+                if entry.world in free_to_play_world_set
+            ]
             
-        await interaction.followup.send(messages[0], ephemeral=True)
+            if not valid_entries:
+                return [f"No stars in `{region}` have been fully called yet."]
+                
+            header = f"Free-to-play star(s) called for [{region}](<{get_region_url(region)}>):"
+            return paginate(header, valid_entries, "size", "f2p")
+
+        with perf.span("find-region-f2p.render"):
+            messages = query_cache.lookup(("find-region-f2p", region, state.guild_id, snapshot.version), render)
        
-        for message in messages[1:]:
-            await interaction.followup.send(message, ephemeral=True)
+        with perf.span("find-region-f2p.followup"):
+            for message in messages:
+                await interaction.followup.send(message, ephemeral=True)
             
     except Exception as e:
         print(f"Error in find_region_f2p command for region {region}: {str(e)}")
@@ -1824,81 +2657,29 @@ async def find_region_f2p(interaction: discord.Interaction, region: str):
 
 @client.tree.command(name="starstruck", description="Find stars in the Feldip Hills region.")
 async def starstruck(interaction: discord.Interaction):
+    state = guild_tables.for_reading(interaction.guild_id)
     try:
         await interaction.response.defer(ephemeral=False)
        
-        if not table_data.get("chunk_message_ids"):
+        if not state.chunk_message_ids:
             await interaction.followup.send("Table does not exist. Use `/create` first.")
             return
-        region = "Feldip Hills"
-        valid_entries = [
-            entry for entry in table_data["entries"]
-            if entry['region'] == region and
-            entry['size'] != "" and
-            entry['game_time'] != "" and
-            entry['game_time_full'] != "" and
-            is_valid_size(entry['size']) and
-            is_valid_game_time(entry['game_time']) and
-            is_valid_game_time_full(entry['game_time_full'])
-        ]
-        if not valid_entries:
-            await interaction.followup.send(f"No stars in `Feldip Hills`, for the starstruck achievement have been fully called yet.")
-            return
-        star_details = []
-        for star in valid_entries:
-            game_time_unix = int(datetime.datetime.fromisoformat(star['game_time_full']).timestamp())
-            world_status = ""
-            match star['world']:
-                case 30:
-                    world_status = " `[2000 Total]`"
-                case 48:
-                    world_status = " `[2600 Total]`"
-                case 52:
-                    world_status = " `[VIP]`"
-                case 86 | 114:
-                    world_status = " `[1500 Total]`"
-                case 47 | 75:
-                    world_status = " `[Português]`"
-                case 101:
-                    world_status = " `[Português Legacy]`"
-                case 94 | 251:
-                    world_status = " `[Português F2P]`"
-                case 118:
-                    world_status = " `[Français]`"
-                case 55:
-                    world_status = " `[Français F2P]`"
-                case 102 | 121:
-                    world_status = " `[Deutsch]`"
-                case 122:
-                    world_status = " `[Deutsch F2P]`"
-                case 18 | 33 | 57 | 115 | 120 | 136 | 137:
-                    world_status = " `[Legacy]`"
-                case _:
-                    if star['world'] in free_to_play_worlds:
-                        world_status = " `[Free-to-play]`"
-                    else:
-                        world_status = " `[Members]`"
-            star_details.append(
-                f"Size `{star['size'][1:]}` on world `{star['world']}`, <t:{game_time_unix}:R> (`{star['game_time']}`).{world_status}"
-            )
-        header = f"Star(s) called for the [Starstruck](<https://runescape.wiki/w/Starstruck>) achievement in [Feldip Hills](<{get_region_url('Feldip Hills')}>):\n"
-        DISCORD_CHAR_LIMIT = 1800
-        messages = []
-        current_message = header
+        with perf.span("starstruck.lookup"):
+            snapshot = state.snapshot()
+
+        def render():
+            valid_entries = snapshot.in_region("Feldip Hills")
+            if not valid_entries:
+                return [f"No stars in `Feldip Hills`, for the starstruck achievement have been fully called yet."]
+            header = f"Star(s) called for the [Starstruck](<https://runescape.wiki/w/Starstruck>) achievement in [Feldip Hills](<{get_region_url('Feldip Hills')}>):"
+            return paginate(header, valid_entries, "size", "status")
+
+        with perf.span("starstruck.render"):
+            messages = query_cache.lookup(("starstruck", None, state.guild_id, snapshot.version), render)
        
-        for detail in star_details:
-            if len(current_message + detail + "\n") > DISCORD_CHAR_LIMIT:
-                messages.append(current_message)
-                current_message = header + detail + "\n"
-            else:
-                current_message += detail + "\n"
-       
-        if current_message != header:
-            messages.append(current_message)
-        await interaction.followup.send(messages[0])
-       
-        for message in messages[1:]:
-            await interaction.followup.send(message)
+        with perf.span("starstruck.followup"):
+            for message in messages:
+                await interaction.followup.send(message)
     except Exception as e:
         print(f"Error in starstruck command: {str(e)}")
         try:
@@ -1908,65 +2689,35 @@ async def starstruck(interaction: discord.Interaction):
 
 @client.tree.command(name="starstruck-f2p", description="Find f2p stars in Crandor/Karamja.")
 async def starstruck_f2p(interaction: discord.Interaction):
+    state = guild_tables.for_reading(interaction.guild_id)
     try:
         await interaction.response.defer(ephemeral=False)
        
-        if not table_data.get("chunk_message_ids"):
+        if not state.chunk_message_ids:
             await interaction.followup.send("Table does not exist. Use `/create` first.", ephemeral=False)
             return
            
-        valid_entries = [
-            entry for entry in table_data["entries"]
-            if entry['region'] == "Crandor/Karamja" and
-               entry['size'] != "" and
-               entry['game_time'] != "" and
-               entry['game_time_full'] != "" and
-               is_valid_size(entry['size']) and
-               is_valid_game_time(entry['game_time']) and
-               is_valid_game_time_full(entry['game_time_full']) and
-               int(entry['world']) in free_to_play_worlds
-        ]
-       
-        if not valid_entries:
-            await interaction.followup.send(f"No free-to-play stars in `Crandor/Karamja`, for the starstruck achievement have been fully called yet.", ephemeral=False)
-            return
-           
-        star_details = []
-        for star in valid_entries:
-            game_time_unix = int(datetime.datetime.fromisoformat(star['game_time_full']).timestamp())
-            world_status = ""
-            match star['world']:
-                case 94 | 251:
-                    world_status = " `[Português]`"
-                case 55:
-                    world_status = " `[Français]`"
-                case 122:
-                    world_status = " `[Deutsch]`"
-                case 33 | 57 | 120 | 136:
-                    world_status = " `[Legacy]`"
-            star_details.append(
-                f"Size `{star['size'][1:]}` on world `{star['world']}`, <t:{game_time_unix}:R> (`{star['game_time']}`).{world_status}"
-            )
-           
-        header = f"Free-to-play star(s) called for the [Starstruck](<https://runescape.wiki/w/Starstruck>) achievement in [Crandor/Karamja](<{get_region_url('Crandor/Karamja')}>):\n"
-        DISCORD_CHAR_LIMIT = 1800
-        messages = []
-        current_message = header
-       
-        for detail in star_details:
-            if len(current_message + detail + "\n") > DISCORD_CHAR_LIMIT:
-                messages.append(current_message)
-                current_message = header + detail + "\n"
-            else:
-                current_message += detail + "\n"
-       
-        if current_message != header:
-            messages.append(current_message)
+        with perf.span("starstruck-f2p.lookup"):
+            snapshot = state.snapshot()
+
+        def render():
+            valid_entries = [
+                entry for entry in snapshot.in_region("Crandor/Karamja")
+                if entry.world in free_to_play_world_set
+            ]
            
-        await interaction.followup.send(messages[0], ephemeral=False)
+            if not valid_entries:
+                return [f"No free-to-play stars in `Crandor/Karamja`, for the starstruck achievement have been fully called yet."]
+               
+            header = f"Free-to-play star(s) called for the [Starstruck](<https://runescape.wiki/w/Starstruck>) achievement in [Crandor/Karamja](<{get_region_url('Crandor/Karamja')}>):"
+            return paginate(header, valid_entries, "size", "f2p")
+
+        with perf.span("starstruck-f2p.render"):
+            messages = query_cache.lookup(("starstruck-f2p", None, state.guild_id, snapshot.version), render)
        
-        for message in messages[1:]:
-            await interaction.followup.send(message, ephemeral=False)
+        with perf.span("starstruck-f2p.followup"):
+            for message in messages:
+                await interaction.followup.send(message, ephemeral=False)
            
     except Exception as e:
         print(f"Error in starstruck_f2p command: {str(e)}")